@@ -1,16 +1,30 @@
 """Hentai Manga Reader - Simple desktop app for reading manga from MangaDex."""
 
 import sys
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
 import customtkinter as ctk
-from tkinter import messagebox
-from PIL import Image
-import io
-import json
+import tkinter as tk
+from tkinter import filedialog, messagebox
+from PIL import Image, ImageTk
 import os
-import threading
 
 from manga_api import MangaDexAPI, MangaResult, ChapterInfo
 from nhentai_api import NHentaiAPI
+from image_cache import ImageCache
+from disk_cache import DiskCache
+from progress_store import ProgressStore
+from http_transport import AsyncTransport, EventLoopThread, SyncTransport, async_available
+from response_cache import ResponseCache
+from rate_limit import RateLimiter, RetryingTransport
+from downloads import DownloadManager, DownloadTask
+from local_archive import ArchiveError, LocalArchiveAPI
+from metadata_index import MetadataIndex
+from reader_core import ALL_SOURCES, LibraryService
+from telemetry import PhaseTimer, process_age, telemetry
+from workers import WorkerPool, Job, PRIORITY_COVER_VISIBLE, PRIORITY_COVER_OFFSCREEN
 
 def _get_base_path():
     if getattr(sys, "frozen", False):
@@ -26,44 +40,61 @@ def _get_data_path():
 
 _APP_DIR = _get_base_path()
 _DATA_DIR = _get_data_path()
-PROGRESS_PATH = os.path.join(_DATA_DIR, "progress.json")
+PROGRESS_PATH = os.path.join(_DATA_DIR, "progress.json")  # legacy, migrated on first run
+PROGRESS_DB_PATH = os.path.join(_DATA_DIR, "progress.db")
+# Search as you type: quiet time after the last keystroke, and shortest query
+SEARCH_DEBOUNCE_MS = 350
+LIVE_SEARCH_MIN_CHARS = 2
+# Every title seen, for offline search and typeahead (SQLite FTS5)
+METADATA_DB_PATH = os.path.join(_DATA_DIR, "metadata.db")
 ICON_PATH = os.path.join(_get_base_path(), "app_icon.ico")
 
-
-def _load_progress() -> dict:
-    try:
-        if os.path.exists(PROGRESS_PATH):
-            with open(PROGRESS_PATH, encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {"mangadex": {}, "nhentai": {}}
-
-
-def get_progress(manga_id: str, source: str) -> tuple[str | None, int]:
-    """Return (chapter_id, page_index) for manga, or (None, 0) if none."""
-    data = _load_progress()
-    src = "nhentai" if source == "nhentai" else "mangadex"
-    if src not in data or manga_id not in data[src]:
-        return None, 0
-    val = data[src][manga_id]
-    if src == "nhentai":
-        return manga_id, int(val) if isinstance(val, (int, float)) else 0
-    if isinstance(val, dict):
-        if "chapter_id" in val:
-            page = val.get("page_index", 0)
-            return val["chapter_id"], int(page) if isinstance(page, (int, float)) else 0
-        for ch_id, page in val.items():
-            return ch_id, int(page) if isinstance(page, (int, float)) else 0
-    return None, 0
-
-
-def _save_progress(data: dict) -> None:
-    try:
-        with open(PROGRESS_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        pass
+# Memory budgets. Page and cover caches hold compressed bytes; renditions are
+# decoded images at display size (width x height x bands bytes)
+IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+COVER_CACHE_BYTES = 32 * 1024 * 1024
+RENDITION_CACHE_BYTES = 192 * 1024 * 1024
+# Grid cover size in widget units; HiDPI displays get the 2x rendition
+COVER_BOX = (175, 240)
+# Downloaded page/cover bytes kept across sessions
+DISK_CACHE_DIR = os.path.join(_DATA_DIR, "cache", "images")
+DISK_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+# Cover renditions at display size (WebP), so the grid never resamples
+THUMB_CACHE_DIR = os.path.join(_DATA_DIR, "cache", "thumbs")
+THUMB_CACHE_BYTES = 256 * 1024 * 1024
+RESPONSE_CACHE_PATH = os.path.join(_DATA_DIR, "cache", "responses.db")
+# Offline chapters, one CBZ per chapter
+DOWNLOADS_DIR = os.path.join(_DATA_DIR, "downloads")
+# Reader read-ahead: pages fetched and decoded around the current one
+PREFETCH_AHEAD = 3
+PREFETCH_BEHIND = 1
+# Long-strip reader: screens loaded ahead/behind the viewport, how far away a
+# shown page is released, and pixels per mouse-wheel notch
+STRIP_AHEAD_SCREENS = 2.0
+STRIP_BEHIND_SCREENS = 1.0
+STRIP_KEEP_SCREENS = 3.0
+STRIP_WHEEL_PX = 120
+# Shared worker pool: total threads and concurrent requests per host
+POOL_WORKERS = 8
+POOL_PER_HOST = 4
+# Opt-in asyncio/httpx backend (HTTP/2 when h2 is installed); needs httpx
+USE_ASYNC_HTTP = os.environ.get("HENTAI_READER_ASYNC_HTTP") == "1"
+# Results grid: cards per row, and rows kept alive above/below the viewport
+GRID_COLS = 6
+GRID_OVERSCAN_ROWS = 2
+# Timing spans/counters, one JSON object per line (rotated at 2 MB)
+TELEMETRY_LOG_PATH = os.path.join(_DATA_DIR, "logs", "telemetry.jsonl")
+OVERLAY_REFRESH_MS = 500
+# Cold-start phase timings, one JSON object per launch
+STARTUP_LOG_PATH = os.path.join(_DATA_DIR, "logs", "startup.jsonl")
+# Last popular-titles page per source, drawn before the network answers
+SNAPSHOT_PATH = os.path.join(_DATA_DIR, "cache", "home.json")
+# Resuming queued downloads waits until the first screen is up
+RESUME_DOWNLOADS_DELAY_MS = 2000
+
+
+# Source dropdown labels
+SOURCE_LABELS = {"nhentai": "NHentai", "mangadex": "MangaDex", ALL_SOURCES: "All sources"}
 
 
 # Dark theme to match reference
@@ -77,28 +108,48 @@ ACCENT = "#4a9eff"
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+_startup = PhaseTimer("startup", start=_STARTUP_T0)
+_startup.mark("imports")
+
+
+def _cache_gauge(cache: ImageCache) -> dict:
+    s = cache.stats()
+    return {"hit": s.hits, "miss": s.misses, "mb": s.bytes // 2**20}
+
 
 class ReaderPopup(ctk.CTkToplevel):
-    """Popup window for reading manga pages. Image fits entirely in view."""
+    """Popup window for reading manga pages. Image fits entirely in view.
+
+    A thin view over a ReaderSession, which owns loading, prefetch and progress.
+    """
 
     def __init__(
         self,
         parent: "MangaReaderApp",
-        urls: list[str],
+        manga: MangaResult,
         chapter: ChapterInfo,
-        manga_id: str = "",
-        source: str = "mangadex",
+        api,
+        urls: list[str],
         initial_page: int = 0,
+        prefetch_ahead: int = PREFETCH_AHEAD,
+        prefetch_behind: int = PREFETCH_BEHIND,
     ):
         super().__init__(parent)
         self.parent_app = parent
-        self.urls = urls
-        self.chapter_id = chapter.id
-        self.manga_id = manga_id
-        self.source = source
-        self.page_index = max(0, min(initial_page, len(urls) - 1)) if urls else 0
+        self._open_args = (manga, chapter, api, urls)
+        self.session = parent.library.session(
+            manga, chapter, api, urls,
+            initial_page=initial_page,
+            box=self._target_box(1100, 850),
+            prefetch_ahead=prefetch_ahead,
+            prefetch_behind=prefetch_behind,
+            on_page=self._on_page,
+            on_loading=self._on_loading,
+            on_error=self._on_error,
+            on_preview=self._on_preview,
+        )
 
-        self.title(f"{parent.current_manga.title} - Ch. {chapter.chapter}")
+        self.title(f"{manga.title} - Ch. {chapter.chapter}")
         self.geometry("1100x850")
         self.transient(parent)
         if os.path.exists(ICON_PATH):
@@ -144,6 +195,12 @@ class ReaderPopup(ctk.CTkToplevel):
         )
         self._autoplay_btn.grid(row=0, column=5, padx=(8, 0))
 
+        ctk.CTkButton(
+            nav, text="Long strip", width=100, height=36,
+            fg_color=BG_CARD, border_width=1, border_color=BORDER_GRAY,
+            command=self._switch_mode,
+        ).grid(row=0, column=6, padx=(8, 0))
+
         # Image area
         self.img_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.img_frame.grid(row=2, column=0, sticky="nsew", padx=20, pady=(0, 20))
@@ -161,15 +218,66 @@ class ReaderPopup(ctk.CTkToplevel):
         self.bind("<Configure>", self._on_resize)
         self.protocol("WM_DELETE_WINDOW", self._on_close)
         self._resize_job = None
+        # perf_counter() when the user asked for the page being waited on
+        self._page_requested: float | None = None
+
+        # Debug overlay with live timings (F3)
+        self._overlay: ctk.CTkLabel | None = None
+        self._overlay_job = None
+        self.bind("<F3>", lambda e: self._toggle_overlay())
 
         self._update_label()
-        self._load_page()
+        self._page_requested = time.perf_counter()
+        self.session.start()
+
+    @property
+    def page_index(self) -> int:
+        return self.session.page_index
 
     def _on_close(self):
-        self._save_progress()
+        if self._overlay_job:
+            self.after_cancel(self._overlay_job)
+        if self._resize_job:
+            self.after_cancel(self._resize_job)
         self._cancel_autoplay()
+        self.session.close()
         self.destroy()
 
+    def _switch_mode(self):
+        # The new reader opens first, so a local archive stays open between them
+        self.parent_app.reader_mode = "strip"
+        self.parent_app._open_reader(*self._open_args, self.page_index)
+        self._on_close()
+
+    def _toggle_overlay(self):
+        if self._overlay is not None:
+            if self._overlay_job:
+                self.after_cancel(self._overlay_job)
+                self._overlay_job = None
+            self._overlay.destroy()
+            self._overlay = None
+            return
+        self._overlay = ctk.CTkLabel(
+            self.img_frame,
+            text="",
+            justify="left",
+            anchor="nw",
+            font=ctk.CTkFont(family="Consolas", size=11),
+            fg_color=BG_CARD,
+            text_color=TEXT_WHITE,
+            corner_radius=6,
+        )
+        self._overlay.place(x=8, y=8)
+        self._refresh_overlay()
+
+    def _refresh_overlay(self):
+        self._overlay_job = None
+        if self._overlay is None or not self._overlay.winfo_exists():
+            return
+        self._overlay.configure(text=telemetry.format_overlay())
+        self._overlay.lift()
+        self._overlay_job = self.after(OVERLAY_REFRESH_MS, self._refresh_overlay)
+
     def _get_autoplay_interval(self) -> int:
         try:
             v = int(self._autoplay_entry.get().strip() or "5")
@@ -194,117 +302,565 @@ class ReaderPopup(ctk.CTkToplevel):
 
     def _schedule_autoplay(self):
         self._cancel_autoplay()
-        if self._autoplay_var.get() and self.page_index < len(self.urls) - 1:
+        if self._autoplay_var.get() and self.page_index < self.session.page_count - 1:
             self._autoplay_interval = self._get_autoplay_interval()
             self._autoplay_job = self.after(self._autoplay_interval, self._autoplay_advance)
 
     def _autoplay_advance(self):
         self._autoplay_job = None
-        if not self._autoplay_var.get() or self.page_index >= len(self.urls) - 1:
-            if self.page_index >= len(self.urls) - 1:
+        last = self.session.page_count - 1
+        if not self._autoplay_var.get() or self.page_index >= last:
+            if self.page_index >= last:
                 self._autoplay_var.set(False)
                 self._autoplay_btn.configure(text="Auto ▶", fg_color=BG_CARD)
             return
-        self.page_index += 1
-        self._update_label()
-        self._save_progress()
-        self._load_page()
-        self._schedule_autoplay()
+        if not self.session.is_ready(self.page_index + 1):
+            # Never flip to a page that is still downloading; check again shortly
+            self._autoplay_job = self.after(250, self._autoplay_advance)
+            return
+        self._goto(self.page_index + 1)
 
     def _prev(self):
-        if self.page_index > 0:
-            self.page_index -= 1
-            self._update_label()
-            self._save_progress()
-            self._load_page()
-            self._schedule_autoplay()
+        self._goto(self.page_index - 1)
 
     def _next(self):
-        if self.page_index < len(self.urls) - 1:
-            self.page_index += 1
+        self._goto(self.page_index + 1)
+
+    def _goto(self, idx: int):
+        requested = time.perf_counter()
+        self._page_requested = requested
+        if self.session.goto(idx):
             self._update_label()
-            self._save_progress()
-            self._load_page()
             self._schedule_autoplay()
+        elif self._page_requested == requested:
+            self._page_requested = None
 
     def _update_label(self):
-        self.page_label.configure(text=f"Page {self.page_index + 1} of {len(self.urls)}")
+        self.page_label.configure(text=f"Page {self.page_index + 1} of {self.session.page_count}")
 
-    def _save_progress(self):
-        if not self.manga_id:
-            return
-        data = _load_progress()
-        src = "nhentai" if self.source == "nhentai" else "mangadex"
-        if src not in data:
-            data[src] = {}
-        if src == "nhentai":
-            data[src][self.manga_id] = self.page_index
-        else:
-            data[src][self.manga_id] = {"chapter_id": self.chapter_id, "page_index": self.page_index}
-        _save_progress(data)
-
-    def _load_page(self):
-        idx = self.page_index
-        if idx < 0 or idx >= len(self.urls):
-            return
-        self.img_label.configure(text=f"Loading page {idx+1}...", image=None)
-        url = self.urls[idx]
-        cache_key = f"{self.chapter_id}_{idx}"
-        lbl = self.img_label
-        win = self
-
-        def load():
-            app = win.parent_app
-            if cache_key not in app.image_cache:
-                try:
-                    api = app.nhentai if getattr(app.current_manga, "source", "") == "nhentai" else app.mangadex
-                    data = api.fetch_image(url)
-                    img = Image.open(io.BytesIO(data)).convert("RGB")
-                    app.image_cache[cache_key] = img
-                except Exception as e:
-                    win.after(0, lambda: lbl.configure(text=f"Failed: {str(e)[:40]}") if lbl.winfo_exists() else None)
-                    return
-            img = app.image_cache[cache_key]
-            win.after(0, lambda: win._display(img))
-
-        threading.Thread(target=load, daemon=True).start()
+    def _target_box(self, w: int, h: int) -> tuple[int, int]:
+        """Area available to the page image for a window of w x h."""
+        if w < 400 or h < 400:
+            w, h = 1100, 850
+        return w - 80, h - 120
 
     def _on_resize(self, event):
         if event.widget != self:
             return
+        # The session shows a cheap resample right away; the high-quality one
+        # follows once events stop for a moment
+        if not self.session.set_box(self._target_box(event.width, event.height)):
+            return
         if self._resize_job:
             self.after_cancel(self._resize_job)
         self._resize_job = self.after(150, self._resize_redisplay)
 
     def _resize_redisplay(self):
         self._resize_job = None
-        cache_key = f"{self.chapter_id}_{self.page_index}"
-        if cache_key in self.parent_app.image_cache:
-            self._display(self.parent_app.image_cache[cache_key])
+        self.session.refine()
+
+    def _on_loading(self, idx: int):
+        self.img_label.configure(text=f"Loading page {idx+1}...", image=None)
 
-    def _display(self, img: Image.Image):
+    def _on_error(self, idx: int, err: Exception):
+        if self.img_label.winfo_exists():
+            self.img_label.configure(text=f"Failed: {str(err)[:40]}")
+
+    def _show_image(self, img: Image.Image) -> bool:
         try:
             if not self.img_label.winfo_exists():
-                return
-            self.update_idletasks()
-            # Fit entire image in window - scale to fit both width and height
-            w, h = self.winfo_width(), self.winfo_height()
-            if w < 400 or h < 400:
-                w, h = 1100, 850
-            avail_w = w - 80
-            avail_h = h - 120
-            ratio_w = avail_w / img.width
-            ratio_h = avail_h / img.height
-            scale = min(ratio_w, ratio_h, 1.0)
-            new_w = int(img.width * scale)
-            new_h = int(img.height * scale)
-            if new_w != img.width or new_h != img.height:
-                img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
-            self.img_label.configure(image=ctk_img, text="")
+                return False
+            with telemetry.span("page.ctkimage"):
+                ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+            # configure() is where CTkLabel converts the image to a Tk PhotoImage
+            with telemetry.span("page.display"):
+                self.img_label.configure(image=ctk_img, text="")
             self.img_label._img_ref = (ctk_img, img)
+            return True
         except Exception:
             self.img_label.configure(text="Failed to display")
+            return False
+
+    def _on_preview(self, idx: int, img: Image.Image):
+        """Partial page while it downloads; the full one replaces it."""
+        self._show_image(img)
+
+    def _on_page(self, idx: int, img: Image.Image):
+        """Show an already-scaled page. Only cheap Tk work happens here."""
+        if not self._show_image(img):
+            return
+        if self._page_requested is not None:
+            telemetry.record("page.total", time.perf_counter() - self._page_requested, page=idx)
+            telemetry.log_snapshot(chapter=self.session.chapter_id, page=idx)
+            self._page_requested = None
+
+
+class StripReaderPopup(ctk.CTkToplevel):
+    """Long-strip reader: the chapter's pages stacked in one scrolling column.
+
+    A thin view over a StripSession. Only pages near the viewport are on the
+    canvas; the rest of the scroll height is empty slots sized from known or
+    estimated page heights.
+    """
+
+    def __init__(
+        self,
+        parent: "MangaReaderApp",
+        manga: MangaResult,
+        chapter: ChapterInfo,
+        api,
+        urls: list[str],
+        initial_page: int = 0,
+    ):
+        super().__init__(parent)
+        self.parent_app = parent
+        self._open_args = (manga, chapter, api, urls)
+        self.session = parent.library.strip_session(
+            manga, chapter, api, urls,
+            initial_page=initial_page,
+            ahead=STRIP_AHEAD_SCREENS,
+            behind=STRIP_BEHIND_SCREENS,
+            keep=STRIP_KEEP_SCREENS,
+            on_page=self._on_page,
+            on_release=self._on_release,
+            on_layout=self._on_layout,
+            on_error=self._on_error,
+        )
+
+        self.title(f"{manga.title} - Ch. {chapter.chapter}")
+        self.geometry("1100x850")
+        self.transient(parent)
+        if os.path.exists(ICON_PATH):
+            self.iconbitmap(ICON_PATH)
+        self.minsize(800, 600)
+        self.configure(fg_color=BG_DARK)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        nav = ctk.CTkFrame(self, fg_color="transparent")
+        nav.grid(row=0, column=0, columnspan=2, sticky="ew", padx=20, pady=(16, 8))
+        nav.grid_columnconfigure(2, weight=1)
+
+        ctk.CTkButton(
+            nav, text="← Previous", command=self._prev, width=100, height=36,
+            fg_color=BG_CARD, border_width=1, border_color=BORDER_GRAY,
+        ).grid(row=0, column=0, padx=(0, 12))
+
+        self.page_label = ctk.CTkLabel(nav, text="", font=ctk.CTkFont(size=14), text_color=TEXT_GRAY)
+        self.page_label.grid(row=0, column=1, padx=12)
+
+        ctk.CTkButton(
+            nav, text="Next →", command=self._next, width=100, height=36,
+            fg_color=ACCENT, hover_color="#3a8eef",
+        ).grid(row=0, column=2, sticky="w", padx=(0, 24))
+
+        ctk.CTkButton(
+            nav, text="Single page", width=100, height=36,
+            fg_color=BG_CARD, border_width=1, border_color=BORDER_GRAY,
+            command=self._switch_mode,
+        ).grid(row=0, column=3)
+
+        # Canvas coordinates are strip pixels: page idx starts at offsets[idx]
+        self.canvas = tk.Canvas(self, bg=BG_DARK, highlightthickness=0, yscrollincrement=1)
+        self.canvas.grid(row=1, column=0, sticky="nsew", padx=(20, 0), pady=(0, 20))
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.canvas.yview)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", padx=(4, 12), pady=(0, 20))
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+
+        # Shown pages (canvas item, photo) and "Loading" labels for visible slots
+        self._items: dict[int, tuple[int, ImageTk.PhotoImage]] = {}
+        self._slots: dict[int, int] = {}
+        self._slot_font = ctk.CTkFont(size=14)
+        self._started = False
+        self._sync_job = None
+        self._resize_job = None
+
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+        if sys.platform.startswith("linux"):
+            self.bind("<Button-4>", lambda e: self._scroll(-STRIP_WHEEL_PX))
+            self.bind("<Button-5>", lambda e: self._scroll(STRIP_WHEEL_PX))
+        else:
+            self.bind("<MouseWheel>", self._on_wheel)
+        self.bind("<Down>", lambda e: self._scroll(STRIP_WHEEL_PX))
+        self.bind("<Up>", lambda e: self._scroll(-STRIP_WHEEL_PX))
+        self.bind("<Next>", lambda e: self._scroll(self._screen()))
+        self.bind("<space>", lambda e: self._scroll(self._screen()))
+        self.bind("<Prior>", lambda e: self._scroll(-self._screen()))
+        self.bind("<Home>", lambda e: self._goto(0))
+        self.bind("<End>", lambda e: self._goto(self.session.page_count - 1))
+        self.bind("<Right>", lambda e: self._next())
+        self.bind("<Left>", lambda e: self._prev())
+        self.bind("<Escape>", lambda e: self._on_close())
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._update_label()
+
+    @property
+    def page_index(self) -> int:
+        return self.session.page_index
+
+    def _on_close(self):
+        for job in (self._sync_job, self._resize_job):
+            if job:
+                self.after_cancel(job)
+        self.session.close()
+        self._items.clear()
+        self.destroy()
+
+    def _switch_mode(self):
+        # The new reader opens first, so a local archive stays open between them
+        self.parent_app.reader_mode = "page"
+        self.parent_app._open_reader(*self._open_args, self.page_index)
+        self._on_close()
+
+    # --- Scrolling ---------------------------------------------------------------
+
+    def _screen(self) -> int:
+        """One page-down: the viewport height less a little overlap."""
+        return max(STRIP_WHEEL_PX, self.canvas.winfo_height() - 60)
+
+    def _on_wheel(self, event):
+        notches = event.delta if sys.platform == "darwin" else event.delta / 120
+        self._scroll(-round(notches * STRIP_WHEEL_PX))
+
+    def _scroll(self, pixels: int):
+        self.canvas.yview_scroll(pixels, "units")
+
+    def _scroll_to(self, top: int):
+        self.canvas.yview_moveto(top / max(1, self.session.total_height))
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._sync_job is None:
+            self._sync_job = self.after(16, self._sync)
+
+    def _sync(self):
+        """Tell the session what is in view; it loads and releases pages around it."""
+        self._sync_job = None
+        top = int(self.canvas.canvasy(0))
+        height = self.canvas.winfo_height()
+        self.session.set_viewport(top, height)
+        self._update_label()
+        # "Loading" labels for visible pages that are not up yet
+        visible = range(self.session.page_at(top), self.session.page_at(top + height) + 1)
+        for idx in [i for i in self._slots if i not in visible or i in self._items]:
+            self.canvas.delete(self._slots.pop(idx))
+        for idx in visible:
+            if idx not in self._items and idx not in self._slots:
+                self._slots[idx] = self.canvas.create_text(
+                    self._page_x(), self.session.offsets[idx] + 40,
+                    text=f"Loading page {idx + 1}...", fill=TEXT_GRAY, font=self._slot_font,
+                )
+
+    def _on_canvas_configure(self, event):
+        if not self._started:
+            # Lay out for the real width before anything is requested
+            self._started = True
+            self.session.start()
+            if not self.session.set_width(event.width):
+                self._on_layout(self.session.offsets[self.page_index])
+            return
+        if self._resize_job:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(150, self._resize_redisplay)
+
+    def _resize_redisplay(self):
+        self._resize_job = None
+        if not self.session.set_width(self.canvas.winfo_width()):
+            self._on_yscroll(*self.canvas.yview())
+
+    # --- Navigation --------------------------------------------------------------
+
+    def _prev(self):
+        self._goto(self.page_index - 1)
+
+    def _next(self):
+        self._goto(self.page_index + 1)
+
+    def _goto(self, idx: int):
+        if self.session.goto(idx):
+            self._scroll_to(self.session.offsets[idx])
+            self._update_label()
+
+    def _update_label(self):
+        self.page_label.configure(text=f"Page {self.page_index + 1} of {self.session.page_count}")
+
+    # --- Session callbacks -------------------------------------------------------
+
+    def _page_x(self) -> int:
+        return self.canvas.winfo_width() // 2
+
+    def _on_page(self, idx: int, img: Image.Image):
+        with telemetry.span("page.display"):
+            photo = ImageTk.PhotoImage(img)
+            item = self.canvas.create_image(self._page_x(), self.session.offsets[idx], image=photo, anchor="n")
+        self._items[idx] = (item, photo)
+        if idx in self._slots:
+            self.canvas.delete(self._slots.pop(idx))
+
+    def _on_release(self, idx: int):
+        entry = self._items.pop(idx, None)
+        if entry is not None:
+            self.canvas.delete(entry[0])
+
+    def _on_layout(self, top: int):
+        """Page slots changed height: move what is shown and keep the view put."""
+        offsets = self.session.offsets
+        x = self._page_x()
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.session.total_height))
+        for idx, (item, _photo) in self._items.items():
+            self.canvas.coords(item, x, offsets[idx])
+        for idx, item in self._slots.items():
+            self.canvas.coords(item, x, offsets[idx] + 40)
+        self._scroll_to(top)
+
+    def _on_error(self, idx: int, err: Exception):
+        if idx in self._slots:
+            self.canvas.itemconfigure(self._slots[idx], text=f"Failed: {str(err)[:40]}")
+
+
+class SuggestionList(ctk.CTkFrame):
+    """Typeahead titles dropped under the search box; rows are reused."""
+
+    MAX_ROWS = 8
+
+    def __init__(self, parent, entry: ctk.CTkEntry, on_pick):
+        super().__init__(parent, fg_color=BG_CARD, border_color=BORDER_GRAY, border_width=1, corner_radius=6)
+        self.entry = entry
+        self.on_pick = on_pick
+        self.titles: list[str] = []
+        self.active: int | None = None
+        self.rows: list[ctk.CTkButton] = []
+        self.grid_columnconfigure(0, weight=1)
+
+    def show(self, titles: list[str]):
+        titles = titles[:self.MAX_ROWS]
+        if not titles:
+            self.hide()
+            return
+        self.titles, self.active = titles, None
+        while len(self.rows) < len(titles):
+            i = len(self.rows)
+            self.rows.append(ctk.CTkButton(
+                self, text="", anchor="w", height=30, fg_color="transparent", hover_color=BORDER_GRAY,
+                text_color=TEXT_WHITE, command=lambda i=i: self.on_pick(self.titles[i]),
+            ))
+        for i, row in enumerate(self.rows):
+            if i < len(titles):
+                row.configure(text=titles[i], fg_color="transparent")
+                row.grid(row=i, column=0, padx=4, pady=(4 if i == 0 else 0, 4 if i == len(titles) - 1 else 0), sticky="ew")
+            else:
+                row.grid_remove()
+        self.place(in_=self.entry, relx=0, rely=1, relwidth=1, y=4)
+        self.lift()
+
+    def hide(self):
+        self.titles, self.active = [], None
+        self.place_forget()
+
+    def move(self, step: int):
+        if not self.titles:
+            return
+        if self.active is None:
+            self.active = 0 if step > 0 else len(self.titles) - 1
+        else:
+            self.rows[self.active].configure(fg_color="transparent")
+            self.active = (self.active + step) % len(self.titles)
+        self.rows[self.active].configure(fg_color=BORDER_GRAY)
+
+    def selected(self) -> str | None:
+        return self.titles[self.active] if self.active is not None else None
+
+
+class MangaCard(ctk.CTkFrame):
+    """Result card. The grid recycles cards, rebinding them to other manga."""
+
+    def __init__(self, app: "MangaReaderApp", parent):
+        super().__init__(
+            parent,
+            width=175,
+            corner_radius=8,
+            fg_color=BG_CARD,
+            border_width=0,
+        )
+        self.app = app
+        self.manga: MangaResult | None = None
+        self._cover_job: Job | None = None
+        self.grid_propagate(False)
+
+        img_frame = ctk.CTkFrame(
+            self, fg_color=BORDER_GRAY, width=175, height=240, corner_radius=6
+        )
+        img_frame.grid(row=0, column=0, padx=8, pady=(8, 6))
+        img_frame.grid_propagate(False)
+
+        self.img_label = ctk.CTkLabel(
+            img_frame,
+            text="Loading...",
+            width=175,
+            height=240,
+            text_color=TEXT_GRAY,
+            font=ctk.CTkFont(size=12),
+        )
+        self.img_label.grid(row=0, column=0)
+
+        self.title_lbl = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            text_color=TEXT_WHITE,
+            fg_color="transparent",
+            wraplength=160,
+            anchor="w",
+            justify="left",
+            height=36,
+        )
+        self.title_lbl.grid(row=1, column=0, padx=8, pady=(0, 2), sticky="w")
+
+        self.tags_lbl = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color=TEXT_GRAY,
+            fg_color="transparent",
+            wraplength=160,
+            anchor="w",
+            justify="left",
+        )
+        self.tags_lbl.grid(row=2, column=0, padx=8, pady=(0, 8), sticky="w")
+
+        for widget in (self, img_frame, self.img_label, self.title_lbl, self.tags_lbl):
+            widget.bind("<Button-1>", lambda e: self._on_click())
+            widget.configure(cursor="hand2")
+
+    def _on_click(self):
+        if self.manga is not None:
+            self.app._open_manga(self.manga)
+
+    def show(self, manga: MangaResult, in_view: bool):
+        """Bind to ``manga`` and start loading its cover."""
+        self.release()
+        self.manga = manga
+        title_text = (manga.title or "Unknown")[:35]
+        if len(manga.title or "") > 35:
+            title_text += "..."
+        self.title_lbl.configure(text=title_text)
+        self.tags_lbl.configure(text=" - ".join(manga.tags[:3]) if manga.tags else "")
+        # A blank image rather than image=None, which CTkLabel does not clear
+        if not manga.cover_url:
+            self.img_label.configure(text="No preview", image=self.app._cover_placeholder())
+            return
+        scale = self.app._cover_scale()
+        cached = self.app.library.cached_cover(manga, scale)
+        if cached is not None:
+            self.app._display_cover(self.img_label, cached)
+            return
+        self.img_label.configure(text="Loading...", image=self.app._cover_placeholder())
+        job = self.app.library.load_cover(
+            manga, PRIORITY_COVER_VISIBLE if in_view else PRIORITY_COVER_OFFSCREEN, scale
+        )
+        job.add_done_callback(lambda f: self.app.after(0, lambda: self._on_cover(manga, f)))
+        self._cover_job = job
+
+    def set_in_view(self, in_view: bool):
+        job = self._cover_job
+        if job is not None and not job.done():
+            self.app.pool.reprioritize(job, PRIORITY_COVER_VISIBLE if in_view else PRIORITY_COVER_OFFSCREEN)
+
+    def release(self):
+        """Drop the cover download, stopping it mid-transfer if it has
+        started; a finished one is ignored."""
+        if self._cover_job is not None:
+            self._cover_job.abort()
+            self._cover_job = None
+        self.manga = None
+
+    def _on_cover(self, manga: MangaResult, job: Job):
+        if manga is not self.manga or job.cancelled() or not self.winfo_exists():
+            return
+        self._cover_job = None
+        if job.exception() is not None:
+            self.img_label.configure(text="No preview")
+        else:
+            self.app._display_cover(self.img_label, job.result())
+
+
+class ResultsGrid:
+    """Virtualized results grid inside the scrollable content frame.
+
+    Only rows within GRID_OVERSCAN_ROWS of the viewport have card widgets;
+    spacer frames above and below stand in for the rest, so the scroll
+    height matches the full result list. Cards leaving the window are
+    recycled for rows coming into it.
+    """
+
+    def __init__(self, app: "MangaReaderApp", parent):
+        self.app = app
+        self.items: list[MangaResult] = []
+        self.cards: dict[int, MangaCard] = {}
+        self._free: list[MangaCard] = []
+        self._pitch = 0
+        bg = parent.cget("bg")
+        self.body = tk.Frame(parent, bg=bg, highlightthickness=0)
+        self.body.grid(row=0, column=0, sticky="nw")
+        for c in range(GRID_COLS):
+            self.body.grid_columnconfigure(c, minsize=191)
+        self._top = tk.Frame(self.body, bg=bg, width=1, highlightthickness=0)
+        self._bottom = tk.Frame(self.body, bg=bg, width=1, highlightthickness=0)
+
+    def set_items(self, items: list[MangaResult]):
+        """Show ``items``; appending keeps every existing card in place."""
+        self.items = items
+        self.layout()
+
+    def _new_card(self) -> MangaCard:
+        card = self._free.pop() if self._free else MangaCard(self.app, self.body)
+        if not self._pitch:
+            pady = 12 * ctk.ScalingTracker.get_widget_scaling(card)
+            self._pitch = card.winfo_reqheight() + round(2 * pady)
+        return card
+
+    def _set_spacer(self, spacer: tk.Frame, row: int, height: int):
+        if height > 0:
+            spacer.configure(height=height)
+            spacer.grid(row=row, column=0, columnspan=GRID_COLS, sticky="w")
+        else:
+            spacer.grid_remove()
+
+    def layout(self):
+        n = len(self.items)
+        if not n:
+            return
+        if not self._pitch:
+            self._free.append(self._new_card())
+        n_rows = (n + GRID_COLS - 1) // GRID_COLS
+        canvas = self.app.main_frame._parent_canvas
+        top = max(0.0, canvas.canvasy(0) - self.body.winfo_y())
+        height = max(canvas.winfo_height(), self._pitch)
+        first_vis = min(n_rows - 1, int(top // self._pitch))
+        last_vis = min(n_rows, int((top + height) // self._pitch) + 1)
+        first = max(0, first_vis - GRID_OVERSCAN_ROWS)
+        last = min(n_rows, last_vis + GRID_OVERSCAN_ROWS)
+        lo, hi = first * GRID_COLS, min(n, last * GRID_COLS)
+
+        for idx in [i for i in self.cards if not lo <= i < hi]:
+            card = self.cards.pop(idx)
+            card.release()
+            card.grid_forget()
+            self._free.append(card)
+        for idx in range(lo, hi):
+            row, col = divmod(idx, GRID_COLS)
+            in_view = first_vis <= row < last_vis
+            card = self.cards.get(idx)
+            if card is None or card.manga is not self.items[idx]:
+                card = card or self._new_card()
+                card.show(self.items[idx], in_view)
+                self.cards[idx] = card
+            else:
+                card.set_in_view(in_view)
+            card.grid(row=row - first + 1, column=col, padx=8, pady=12, sticky="nw")
+        self._set_spacer(self._top, 0, first * self._pitch)
+        self._set_spacer(self._bottom, last - first + 1, (n_rows - last) * self._pitch)
 
 
 class MangaReaderApp(ctk.CTk):
@@ -317,21 +873,99 @@ class MangaReaderApp(ctk.CTk):
             self.iconbitmap(ICON_PATH)
         self.configure(fg_color=BG_DARK)
 
-        self.mangadex = MangaDexAPI()
-        self.nhentai = NHentaiAPI()
-        self._current_source = "nhentai"  # Default: hentai source
+        try:
+            os.makedirs(os.path.dirname(TELEMETRY_LOG_PATH), exist_ok=True)
+            telemetry.open_log(TELEMETRY_LOG_PATH)
+        except OSError:
+            pass  # timings still show in the overlay
+        self.pool = WorkerPool(max_workers=POOL_WORKERS, per_host=POOL_PER_HOST)
+        self.disk_cache = DiskCache(DISK_CACHE_DIR, DISK_CACHE_BYTES)
+        self.thumb_cache = DiskCache(THUMB_CACHE_DIR, THUMB_CACHE_BYTES)
+        self.progress = ProgressStore(PROGRESS_DB_PATH, legacy_json_path=PROGRESS_PATH)
+        self.metadata_index = MetadataIndex(METADATA_DB_PATH)
+        self._download_buttons: dict[str, ctk.CTkButton] = {}
+        self.http_loop: EventLoopThread | None = None
+        if USE_ASYNC_HTTP and async_available():
+            # Both clients share one event-loop thread; workers block on it
+            self.http_loop = EventLoopThread()
+            md_transport = AsyncTransport(self.http_loop, headers=MangaDexAPI.HEADERS, per_host=POOL_PER_HOST)
+            nh_transport = AsyncTransport(self.http_loop, headers=NHentaiAPI.HEADERS, per_host=POOL_PER_HOST)
+        else:
+            md_transport = SyncTransport(headers=MangaDexAPI.HEADERS)
+            nh_transport = SyncTransport(headers=NHentaiAPI.HEADERS)
+        # One limiter for both clients so prefetch and covers share the budget
+        self.rate_limiter = RateLimiter()
+        self.rate_limiter.configure(MangaDexAPI.RATE_LIMITS)
+        self.rate_limiter.configure(NHentaiAPI.RATE_LIMITS)
+        md_transport = RetryingTransport(md_transport, self.rate_limiter)
+        nh_transport = RetryingTransport(nh_transport, self.rate_limiter)
+        self.response_cache = ResponseCache(RESPONSE_CACHE_PATH, pool=self.pool)
+        self.mangadex = MangaDexAPI(
+            disk_cache=self.disk_cache, transport=md_transport, response_cache=self.response_cache
+        )
+        self.nhentai = NHentaiAPI(
+            disk_cache=self.disk_cache, transport=nh_transport, response_cache=self.response_cache
+        )
+        self.downloads = DownloadManager(
+            DOWNLOADS_DIR,
+            {"mangadex": self.mangadex, "nhentai": self.nhentai},
+            self.pool,
+            on_update=lambda t: self.after(0, lambda: self._on_download_update(t)),
+        )
+        self.image_cache = ImageCache(IMAGE_CACHE_BYTES)
+        self.cover_cache = ImageCache(COVER_CACHE_BYTES)
+        self.rendition_cache = ImageCache(RENDITION_CACHE_BYTES)
+        # Everything below the widgets: fetching, caching, paging and progress.
+        # Its callbacks are delivered on the Tk thread.
+        self.library = LibraryService(
+            {"mangadex": self.mangadex, "nhentai": self.nhentai},
+            self.pool,
+            self.progress,
+            self.image_cache,
+            self.cover_cache,
+            self.rendition_cache,
+            downloads=self.downloads,
+            cover_box=COVER_BOX,
+            thumb_cache=self.thumb_cache,
+            dispatch=lambda fn: self.after(0, fn),
+            snapshot_path=SNAPSHOT_PATH,
+            index=self.metadata_index,
+        )
         self.current_manga: MangaResult | None = None
         self.current_chapters: list[ChapterInfo] = []
         self.view_state = "search"
-        self.image_cache: dict[str, Image.Image] = {}
-        self.cover_cache: dict[str, Image.Image] = {}
-        self._manga_results: list[MangaResult] = []
-        self._manga_offset = 0
-        self._manga_total = 0
-        self._manga_mode = "browse"
-        self._manga_query = ""
+        self._results_grid: ResultsGrid | None = None
+        self._grid_layout_job = None
+        self._placeholder: ctk.CTkImage | None = None
+        self._showing_snapshot = False
+        # False while later answers (other sources, the live list behind a
+        # snapshot) should update the shown grid in place
+        self._replace_grid = True
+        self._live_search_job = None
+        # "page" (one page fitted to the window) or "strip" (continuous scroll)
+        self.reader_mode = "page"
+
+        telemetry.gauge("jobs.queued", self.pool.pending)
+        telemetry.gauge("page_cache", lambda: _cache_gauge(self.image_cache))
+        telemetry.gauge("render_cache", lambda: _cache_gauge(self.rendition_cache))
+        telemetry.gauge("cover_cache", lambda: _cache_gauge(self.cover_cache))
 
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        _startup.mark("services")
         self._build_ui()
+        _startup.mark("ui")
+        # Idle callbacks run once the pending redraws are done
+        self.after_idle(lambda: _startup.mark("first_paint"))
+        self.after(RESUME_DOWNLOADS_DELAY_MS, self.downloads.resume_pending)
+
+    def _on_close(self):
+        self.progress.close()
+        self.metadata_index.close()
+        self.response_cache.close()
+        if self.http_loop is not None:
+            self.http_loop.stop()
+        telemetry.close()
+        self.destroy()
 
     def _build_ui(self):
         self.grid_columnconfigure(0, weight=1)
@@ -370,13 +1004,20 @@ class MangaReaderApp(ctk.CTk):
             placeholder_text_color=TEXT_GRAY,
         )
         self.search_entry.grid(row=0, column=0, padx=(0, 12), pady=0, sticky="ew")
-        self.search_entry.bind("<Return>", lambda e: self._do_search())
+        self.search_entry.bind("<Return>", self._on_search_return)
+        self.search_entry.bind("<KeyRelease>", self._on_search_typed)
+        self.search_entry.bind("<Down>", lambda e: self.suggestions.move(1))
+        self.search_entry.bind("<Up>", lambda e: self.suggestions.move(-1))
+        self.search_entry.bind("<Escape>", lambda e: self.suggestions.hide())
+        # Let a click on a suggestion land before the list goes away
+        self.search_entry.bind("<FocusOut>", lambda e: self.after(200, self.suggestions.hide), add="+")
+        self.suggestions = SuggestionList(self, self.search_entry, on_pick=self._pick_suggestion)
 
         self.source_var = ctk.StringVar(value="NHentai")
         source_menu = ctk.CTkOptionMenu(
             filter_frame,
             variable=self.source_var,
-            values=["NHentai", "MangaDex"],
+            values=list(SOURCE_LABELS.values()),
             height=40,
             width=120,
             fg_color=BG_CARD,
@@ -442,10 +1083,25 @@ class MangaReaderApp(ctk.CTk):
         self.back_btn.grid(row=0, column=6, padx=(12, 0), pady=0)
         self.back_btn.grid_remove()
 
+        ctk.CTkButton(
+            filter_frame,
+            text="Open CBZ",
+            command=self._open_local_archive,
+            width=100,
+            height=40,
+            fg_color="transparent",
+            border_width=1,
+            border_color=BORDER_GRAY,
+            text_color=TEXT_WHITE,
+        ).grid(row=0, column=7, padx=(12, 0), pady=0)
+
         # Main content area - scrollable grid
         self.main_frame = ctk.CTkScrollableFrame(self, fg_color="transparent")
         self.main_frame.grid(row=2, column=0, padx=32, pady=(0, 24), sticky="nsew")
         self.main_frame.grid_columnconfigure(0, weight=1)
+        # Wrap the scrollable frame's own scrollbar update to follow the viewport
+        self.main_frame._parent_canvas.configure(yscrollcommand=self._on_grid_scroll)
+        self.main_frame._parent_canvas.bind("<Configure>", lambda e: self._schedule_grid_layout(), add="+")
 
         # Status label
         self.status_label = ctk.CTkLabel(
@@ -455,41 +1111,78 @@ class MangaReaderApp(ctk.CTk):
 
         self._load_recommendations()
 
-    def _api(self):
-        return self.nhentai if self.source_var.get() == "NHentai" else self.mangadex
-
-    def _api_for_manga(self, manga: MangaResult):
-        return self.nhentai if getattr(manga, "source", "mangadex") == "nhentai" else self.mangadex
+    def _source(self) -> str:
+        label = self.source_var.get()
+        return next((s for s, text in SOURCE_LABELS.items() if text == label), "nhentai")
 
     def _on_source_change(self, _value=None):
-        self._current_source = "nhentai" if self.source_var.get() == "NHentai" else "mangadex"
         self._load_recommendations()
 
     def _load_recommendations(self):
-        """Load popular manga on app start."""
-        self.status_label.configure(text="Loading recommendations...")
-        threading.Thread(target=self._recommendations_thread, daemon=True).start()
-
-    def _recommendations_thread(self):
-        try:
-            results, total = self._api().browse_manga(limit=24, offset=0, include_adult=self.adult_var.get())
-            self.after(0, lambda: self._show_recommendations(results, total))
-        except Exception as e:
-            self.after(0, lambda: self._show_search_prompt(str(e)))
+        """Load popular manga, showing the last saved page of them meanwhile."""
+        self._showing_snapshot = self.library.load_snapshot(self._source(), self.adult_var.get())
+        if self._showing_snapshot:
+            self.view_state = "search"
+            self.status_label.configure(text="Popular manga — updating...")
+            self._render_manga_grid()
+        else:
+            self.status_label.configure(text="Loading recommendations...")
+        self._replace_grid = not self._showing_snapshot
+        self.library.browse(
+            self._source(),
+            self.adult_var.get(),
+            on_done=self._show_recommendations,
+            on_error=self._recommendations_error,
+        )
 
-    def _show_recommendations(self, results: list[MangaResult], total: int = 0):
+    def _recommendations_error(self, e: Exception):
+        if self._showing_snapshot:
+            # Keep the saved titles; they still open from cache where possible
+            self.status_label.configure(text=f"Popular manga (offline copy) — {e}")
+            return
+        self._show_search_prompt(str(e))
+
+    def _show_recommendations(self, results: list[MangaResult], total: int):
+        _startup.mark("live_results")
+        self._write_startup_report()
+        self._showing_snapshot = False
+        self._update_grid()
+
+    def _update_grid(self, empty_msg: str = "No results found."):
+        """Show the library's results: a fresh grid for a new browse/search,
+        in place for later answers to the same one."""
+        if not self._replace_grid and self.view_state == "chapters":
+            return  # a title was opened from the partial results meanwhile
         self.view_state = "search"
-        self._manga_results = results
-        self._manga_offset = len(results)
-        self._manga_total = total or len(results)
-        self._manga_mode = "browse"
-        self._manga_query = ""
-        self.status_label.configure(text="Popular manga — Search above to find more")
-        self._render_manga_grid(append=False)
+        self.status_label.configure(text=self._results_status())
+        if not self._replace_grid and self._results_grid is not None:
+            # Same grid, so scroll position and already-drawn covers stay put
+            self._results_grid.set_items(self.library.results)
+            self._update_load_more()
+        else:
+            self._render_manga_grid(empty_msg)
+        self._replace_grid = False
+
+    def _write_startup_report(self):
+        if "report" in _startup.phases:
+            return
+        _startup.mark("report")
+        age = process_age()
+        # Interpreter (and, frozen, bootloader/unpack) time before app.py ran
+        before_main = age - (time.perf_counter() - _STARTUP_T0) if age is not None else None
+        try:
+            os.makedirs(os.path.dirname(STARTUP_LOG_PATH), exist_ok=True)
+            _startup.append_to(
+                STARTUP_LOG_PATH,
+                before_main_ms=round(before_main * 1000, 1) if before_main is not None else None,
+                frozen=bool(getattr(sys, "frozen", False)),
+                snapshot=self._showing_snapshot,
+            )
+        except OSError:
+            pass
 
     def _show_search_prompt(self, error_msg: str = ""):
-        for w in self.main_frame.winfo_children():
-            w.destroy()
+        self._clear_main()
         text = "Enter a manga title above and click Search.\nResults come from MangaDex."
         if error_msg:
             text = f"Could not load recommendations: {error_msg}\n\n{text}"
@@ -501,229 +1194,208 @@ class MangaReaderApp(ctk.CTk):
         )
         lbl.grid(row=0, column=0, pady=60)
 
-    def _do_search(self):
+    def _on_search_typed(self, event):
+        if event.keysym in ("Return", "KP_Enter", "Escape", "Up", "Down"):
+            return
+        text = self.search_entry.get().strip()
+        # Local index only, so this stays well within a keystroke
+        self.suggestions.show(self.library.suggest(text, self._source()) if text else [])
+        if self._live_search_job is not None:
+            self.after_cancel(self._live_search_job)
+        self._live_search_job = self.after(SEARCH_DEBOUNCE_MS, self._live_search)
+
+    def _live_search(self):
+        self._live_search_job = None
+        query = self.search_entry.get().strip()
+        if len(query) < LIVE_SEARCH_MIN_CHARS:
+            return
+        lib = self.library
+        if (lib.mode, lib.query, lib.source) == ("search", query, self._source()):
+            return
+        self._do_search(live=True)
+
+    def _on_search_return(self, _event=None):
+        title = self.suggestions.selected()
+        if title is not None:
+            self._pick_suggestion(title)
+        else:
+            self._do_search()
+
+    def _pick_suggestion(self, title: str):
+        self.search_entry.delete(0, "end")
+        self.search_entry.insert(0, title)
+        self._do_search()
+
+    def _do_search(self, live: bool = False):
+        """Search now. ``live`` searches come from typing: the list stays
+        open and failures only show in the status line."""
+        if self._live_search_job is not None:
+            self.after_cancel(self._live_search_job)
+            self._live_search_job = None
+        if not live:
+            self.suggestions.hide()
         query = self.search_entry.get().strip()
         if not query:
-            messagebox.showinfo("Search", "Please enter a search term.")
+            if not live:
+                messagebox.showinfo("Search", "Please enter a search term.")
             return
-        self.search_btn.configure(state="disabled", text="Searching...")
+        if not live:
+            self.search_btn.configure(state="disabled", text="Searching...")
         self.status_label.configure(text=f"Searching for '{query}'...")
-        threading.Thread(
-            target=self._search_thread,
-            args=(query,),
-            daemon=True,
-        ).start()
-
-    def _search_thread(self, query: str):
-        try:
-            results, total = self._api().search_manga(
-                query, limit=24, include_adult=self.adult_var.get()
-            )
-            self.after(0, lambda: self._show_results(results, total, query))
-        except Exception as e:
-            self.after(0, lambda: self._search_error(str(e)))
+        self._replace_grid = True
+        # Superseded searches are aborted by the library; repeats and longer
+        # queries are answered from finished ones where possible
+        self.library.search(
+            self._source(),
+            query,
+            self.adult_var.get(),
+            on_done=self._show_results,
+            on_error=lambda e: self._search_error(str(e), live),
+            reuse=True,
+        )
 
-    def _search_error(self, msg: str):
+    def _search_error(self, msg: str, live: bool = False):
         self.search_btn.configure(state="normal", text="Search")
+        if live:
+            self.status_label.configure(text=f"Search failed: {msg}")
+            return
         self.status_label.configure(text="")
         messagebox.showerror("Search Error", msg)
 
-    def _show_results(self, results: list[MangaResult], total: int, query: str):
-        self.view_state = "search"
+    def _show_results(self, results: list[MangaResult], total: int):
         self.search_btn.configure(state="normal", text="Search")
-        self._manga_results = results
-        self._manga_offset = len(results)
-        self._manga_total = total
-        self._manga_mode = "search"
-        self._manga_query = query
-        self.status_label.configure(text=f"Found {total} result(s) for '{query}'")
-        self._render_manga_grid(append=False, empty_msg="No results found. Try a different search.")
+        self._update_grid(empty_msg="No results found. Try a different search.")
+
+    def _results_status(self) -> str:
+        lib = self.library
+        if lib.mode == "search":
+            text = f"Found {lib.total} result(s) for '{lib.query}'"
+        else:
+            text = "Popular manga — Search above to find more"
+        if lib.pending_sources:
+            text += f" — waiting for {', '.join(SOURCE_LABELS[s] for s in sorted(lib.pending_sources))}"
+        if lib.failed_sources:
+            text += f" — {', '.join(SOURCE_LABELS[s] for s in sorted(lib.failed_sources))} unavailable"
+        return text
 
     def _load_more(self):
-        if self._manga_offset >= self._manga_total:
+        if not self.library.has_more:
             return
         self.status_label.configure(text="Loading more...")
-        threading.Thread(target=self._load_more_thread, daemon=True).start()
+        self.library.load_more(on_done=self._append_results, on_error=self._load_more_error)
 
-    def _load_more_thread(self):
-        try:
-            limit = 24
-            if self._manga_mode == "browse":
-                results, total = self._api().browse_manga(
-                    limit=limit, offset=self._manga_offset, include_adult=self.adult_var.get()
-                )
-            else:
-                results, total = self._api().search_manga(
-                    self._manga_query,
-                    limit=limit,
-                    offset=self._manga_offset,
-                    include_adult=self.adult_var.get(),
-                )
-            self.after(0, lambda: self._append_results(results, total))
-        except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-            self.after(0, lambda: self.status_label.configure(
-                text=f"Found {self._manga_total} result(s)" + (f" for '{self._manga_query}'" if self._manga_query else "")
-            ))
+    def _load_more_error(self, e: Exception):
+        messagebox.showerror("Error", str(e))
+        self.status_label.configure(text=self._results_status())
 
     def _append_results(self, results: list[MangaResult], total: int):
-        self._manga_results.extend(results)
-        self._manga_offset = len(self._manga_results)
-        self._manga_total = total
-        if self._manga_query:
-            self.status_label.configure(text=f"Found {total} result(s) for '{self._manga_query}'")
+        self.status_label.configure(text=self._results_status())
+        if self._results_grid is not None:
+            self._results_grid.set_items(self.library.results)
+            self._update_load_more()
         else:
-            self.status_label.configure(text="Popular manga — Search above to find more")
-        self._render_manga_grid(append=True)
+            self._render_manga_grid()
 
-    def _render_manga_grid(self, append: bool = False, empty_msg: str = "No results found."):
+    def _clear_main(self):
+        """Empty the content area, dropping queued cover downloads."""
+        self.library.cancel_covers()
+        self._results_grid = None
         for w in self.main_frame.winfo_children():
             w.destroy()
-        results = self._manga_results
+
+    def _render_manga_grid(self, empty_msg: str = "No results found."):
+        self._clear_main()
+        results = self.library.results
         if not results:
             ctk.CTkLabel(
                 self.main_frame, text=empty_msg, text_color=TEXT_GRAY
             ).grid(row=0, column=0, pady=60)
             return
-        COLS = 6
-        for c in range(COLS):
-            self.main_frame.grid_columnconfigure(c, weight=0, minsize=191)
-        for i, manga in enumerate(results):
-            row, col = divmod(i, COLS)
-            card = self._make_manga_card(manga)
-            card.grid(row=row, column=col, padx=8, pady=12, sticky="nw")
-
-        if self._manga_offset < self._manga_total:
-            load_row = (len(results) + COLS - 1) // COLS
-            load_btn = ctk.CTkButton(
-                self.main_frame,
-                text="Load more",
-                command=self._load_more,
-                width=140,
-                height=40,
-                fg_color=ACCENT,
-                hover_color="#3a8eef",
-            )
-            load_btn.grid(row=load_row, column=0, columnspan=COLS, pady=24, sticky="n")
-
-    def _make_manga_card(self, manga: MangaResult) -> ctk.CTkFrame:
-        card = ctk.CTkFrame(
+        self.main_frame._parent_canvas.yview_moveto(0)
+        self._results_grid = ResultsGrid(self, self.main_frame)
+        self._results_grid.set_items(results)
+        self._load_more_btn = ctk.CTkButton(
             self.main_frame,
-            width=175,
-            corner_radius=8,
-            fg_color=BG_CARD,
-            border_width=0,
+            text="Load more",
+            command=self._load_more,
+            width=140,
+            height=40,
+            fg_color=ACCENT,
+            hover_color="#3a8eef",
         )
-        card.grid_propagate(False)
+        self._update_load_more()
 
-        img_frame = ctk.CTkFrame(
-            card, fg_color=BORDER_GRAY, width=175, height=240, corner_radius=6
-        )
-        img_frame.grid(row=0, column=0, padx=8, pady=(8, 6))
-        img_frame.grid_propagate(False)
+    def _update_load_more(self):
+        if self.library.has_more:
+            self._load_more_btn.grid(row=1, column=0, pady=24, sticky="n")
+        else:
+            self._load_more_btn.grid_remove()
 
-        img_label = ctk.CTkLabel(
-            img_frame,
-            text="Loading...",
-            width=175,
-            height=240,
-            text_color=TEXT_GRAY,
-            font=ctk.CTkFont(size=12),
-        )
-        img_label.grid(row=0, column=0)
+    def _on_grid_scroll(self, first, last):
+        self.main_frame._scrollbar.set(first, last)
+        self._schedule_grid_layout()
 
-        def load_cover(lbl=img_label, mid=manga.id):
-            if not manga.cover_url:
-                self.after(0, lambda l=lbl: l.configure(text="No preview") if l.winfo_exists() else None)
-                return
-            if mid in self.cover_cache:
-                self.after(0, lambda: self._display_cover(lbl, self.cover_cache[mid]))
-                return
-            try:
-                data = self._api_for_manga(manga).fetch_image(manga.cover_url)
-                img = Image.open(io.BytesIO(data)).convert("RGB")
-                img.thumbnail((350, 480), Image.Resampling.LANCZOS)
-                self.cover_cache[mid] = img
-                self.after(0, lambda: self._display_cover(lbl, img))
-            except Exception:
-                self.after(0, lambda l=lbl: l.configure(text="No preview") if l.winfo_exists() else None)
+    def _schedule_grid_layout(self):
+        if self._results_grid is not None and self._grid_layout_job is None:
+            self._grid_layout_job = self.after(16, self._run_grid_layout)
 
-        threading.Thread(target=load_cover, daemon=True).start()
+    def _run_grid_layout(self):
+        self._grid_layout_job = None
+        if self._results_grid is not None:
+            self._results_grid.layout()
 
-        title_text = (manga.title or "Unknown")[:35]
-        if len(manga.title or "") > 35:
-            title_text += "..."
-        title_lbl = ctk.CTkLabel(
-            card,
-            text=title_text,
-            font=ctk.CTkFont(size=13, weight="bold"),
-            text_color=TEXT_WHITE,
-            fg_color="transparent",
-            wraplength=160,
-            anchor="w",
-            justify="left",
-            height=36,
-        )
-        title_lbl.grid(row=1, column=0, padx=8, pady=(0, 2), sticky="w")
-
-        tags_text = " - ".join(manga.tags[:3]) if manga.tags else ""
-        tags_lbl = ctk.CTkLabel(
-            card,
-            text=tags_text,
-            font=ctk.CTkFont(size=11),
-            text_color=TEXT_GRAY,
-            fg_color="transparent",
-            wraplength=160,
-            anchor="w",
-            justify="left",
-        )
-        tags_lbl.grid(row=2, column=0, padx=8, pady=(0, 8), sticky="w")
-
-        def on_click():
-            self._open_manga(manga)
+    def _cover_placeholder(self) -> ctk.CTkImage:
+        if self._placeholder is None:
+            img = Image.new("RGB", COVER_BOX, BORDER_GRAY)
+            self._placeholder = ctk.CTkImage(light_image=img, dark_image=img, size=COVER_BOX)
+        return self._placeholder
 
-        for widget in (card, img_frame, img_label, title_lbl, tags_lbl):
-            widget.bind("<Button-1>", lambda e: on_click())
-            widget.configure(cursor="hand2")
-
-        return card
+    def _cover_scale(self) -> int:
+        """Which cover rendition matches the window's widget scaling."""
+        return 2 if ctk.ScalingTracker.get_widget_scaling(self) > 1.0 else 1
 
     def _display_cover(self, label: ctk.CTkLabel, img: Image.Image):
         try:
             if not label.winfo_exists():
                 return
-            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=(175, 240))
-            label.configure(image=ctk_img, text="")
+            with telemetry.span("cover.display"):
+                ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=COVER_BOX)
+                label.configure(image=ctk_img, text="")
             label._img_ref = (ctk_img, img)
         except Exception:
             label.configure(text="No preview")
 
+    def _open_local_archive(self):
+        path = filedialog.askopenfilename(
+            title="Open comic archive",
+            filetypes=[("Comic archives", "*.cbz *.zip"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            # Maps the file and reads only the central directory, so this is instant
+            manga = self.library.open_archive(path)
+        except (OSError, ArchiveError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self._open_manga(manga)
+
     def _open_manga(self, manga: MangaResult):
         self.current_manga = manga
         self.view_state = "chapters"
         self.back_btn.grid()
         self.status_label.configure(text=f"Loading chapters for {manga.title}...")
-        threading.Thread(
-            target=self._load_chapters_thread,
-            args=(manga.id,),
-            daemon=True,
-        ).start()
+        self.library.load_chapters(manga, on_done=self._show_chapters, on_error=self._chapters_error)
 
-    def _load_chapters_thread(self, manga_id: str):
-        try:
-            api = self.nhentai if self.current_manga and getattr(self.current_manga, "source", "") == "nhentai" else self.mangadex
-            chapters = api.get_manga_chapters(manga_id)
-            self.after(0, lambda: self._show_chapters(chapters))
-        except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-            self.after(0, lambda: self.status_label.configure(text=""))
+    def _chapters_error(self, e: Exception):
+        messagebox.showerror("Error", str(e))
+        self.status_label.configure(text="")
 
     def _show_chapters(self, chapters: list[ChapterInfo]):
         self.status_label.configure(
             text=f"{self.current_manga.title} - {len(chapters)} chapters"
         )
-        for w in self.main_frame.winfo_children():
-            w.destroy()
+        self._clear_main()
 
         if not chapters:
             ctk.CTkLabel(
@@ -734,8 +1406,8 @@ class MangaReaderApp(ctk.CTk):
             return
 
         self.current_chapters = chapters
-        source = getattr(self.current_manga, "source", "mangadex")
-        saved_ch_id, saved_page = get_progress(self.current_manga.id, source)
+        source = self.current_manga.source
+        saved_ch_id, saved_page = self.library.saved_progress(self.current_manga)
 
         ctk.CTkLabel(
             self.main_frame,
@@ -759,6 +1431,7 @@ class MangaReaderApp(ctk.CTk):
                 resume_btn.grid(row=row_idx, column=0, sticky="ew", pady=2)
                 row_idx += 1
 
+        self._download_buttons = {}
         for i, ch in enumerate(reversed(chapters)):
             btn = ctk.CTkButton(
                 self.main_frame,
@@ -771,44 +1444,84 @@ class MangaReaderApp(ctk.CTk):
                 hover_color=("gray75", "gray25"),
             )
             btn.grid(row=row_idx + i, column=0, sticky="ew", pady=2)
+            if source == LocalArchiveAPI.SOURCE:
+                continue
+            dl_btn = ctk.CTkButton(
+                self.main_frame,
+                text=self._download_label(source, ch),
+                command=lambda c=ch: self._download_chapter(c),
+                width=90,
+                height=36,
+                fg_color="transparent",
+                border_width=1,
+                border_color=BORDER_GRAY,
+                text_color=TEXT_GRAY,
+            )
+            dl_btn.grid(row=row_idx + i, column=1, padx=(8, 0), pady=2)
+            self._download_buttons[ch.id] = dl_btn
         self.main_frame.grid_columnconfigure(0, weight=1)
 
+    def _download_label(self, source: str, chapter: ChapterInfo) -> str:
+        if self.downloads.is_downloaded(source, self.current_manga.id, chapter.id):
+            return "Offline ✓"
+        task = self.downloads.task_for(source, chapter.id)
+        # Clicking a queued or running download cancels it
+        if task is not None and task.state == "running" and task.pages_total:
+            return f"✕ {task.pages_done}/{task.pages_total}"
+        if task is not None and task.state in ("queued", "running"):
+            return "✕ Queued"
+        return "Download"
+
+    def _download_chapter(self, chapter: ChapterInfo):
+        if self.current_manga is None:
+            return
+        source = self.current_manga.source
+        if self.downloads.is_downloaded(source, self.current_manga.id, chapter.id):
+            return
+        task = self.downloads.task_for(source, chapter.id)
+        if task is not None and task.state in ("queued", "running"):
+            self.downloads.cancel(task)
+            return
+        self.downloads.enqueue(self.current_manga, chapter)
+
+    def _on_download_update(self, task: DownloadTask):
+        btn = self._download_buttons.get(task.chapter_id)
+        if btn is not None and btn.winfo_exists() and self.current_manga is not None:
+            ch = next((c for c in self.current_chapters if c.id == task.chapter_id), None)
+            if ch is not None:
+                btn.configure(text=self._download_label(task.source, ch))
+        if task.state in ("running", "done", "failed", "cancelled"):
+            self.status_label.configure(text=task.summary())
+
     def _open_chapter_resume(self, chapter_id: str, page_index: int):
         ch = next((c for c in self.current_chapters if c.id == chapter_id), None)
         if ch:
             self._open_chapter(ch, page_index)
 
-    def _open_chapter(self, chapter: ChapterInfo, initial_page: int = -1):
-        if initial_page < 0:
-            saved_ch_id, saved_page = get_progress(
-                self.current_manga.id,
-                getattr(self.current_manga, "source", "mangadex"),
-            )
-            initial_page = saved_page if saved_ch_id == chapter.id else 0
+    def _open_chapter(self, chapter: ChapterInfo, initial_page: int | None = None):
+        manga = self.current_manga
         self.status_label.configure(text=f"Loading chapter {chapter.chapter}...")
-        threading.Thread(
-            target=self._load_chapter_thread,
-            args=(chapter, initial_page),
-            daemon=True,
-        ).start()
 
-    def _load_chapter_thread(self, chapter: ChapterInfo, initial_page: int = 0):
-        try:
-            api = self.nhentai if self.current_manga and getattr(self.current_manga, "source", "") == "nhentai" else self.mangadex
-            urls = api.get_chapter_images(chapter.id)
+        def opened(api, urls: list[str], page: int):
             if not urls:
-                self.after(0, lambda: messagebox.showwarning("No pages", "Could not load chapter pages."))
-                self.after(0, lambda: self.status_label.configure(text=""))
+                messagebox.showwarning("No pages", "Could not load chapter pages.")
+                self.status_label.configure(text="")
                 return
-            manga_id = self.current_manga.id if self.current_manga else ""
-            source = getattr(self.current_manga, "source", "mangadex") if self.current_manga else "mangadex"
-            self.after(0, lambda: ReaderPopup(self, urls, chapter, manga_id=manga_id, source=source, initial_page=initial_page))
-        except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-            self.after(0, lambda: self.status_label.configure(text=""))
+            self._open_reader(manga, chapter, api, urls, page)
+
+        self.library.open_chapter(
+            manga, chapter, on_done=opened, on_error=self._chapters_error, initial_page=initial_page
+        )
+
+    def _open_reader(self, manga: MangaResult, chapter: ChapterInfo, api, urls: list[str], page: int = 0):
+        if self.reader_mode == "strip":
+            StripReaderPopup(self, manga, chapter, api, urls, initial_page=page)
+        else:
+            ReaderPopup(self, manga, chapter, api, urls, initial_page=page)
 
     def _go_back(self):
         if self.view_state == "chapters":
+            self.library.cancel("chapters", "open")
             self.view_state = "search"
             self.back_btn.grid_remove()
             self.current_manga = None
@@ -0,0 +1,548 @@
+"""Offline benchmark: replay recorded API and image fixtures from a local stub server.
+
+    python benchmark.py synth bench_fixtures              # generate synthetic fixtures
+    python benchmark.py record bench_fixtures --manga-id <uuid> --chapter-id <uuid> --gallery-id <id>
+    python benchmark.py run bench_fixtures --out bench_results/run.json
+
+``record`` runs the benchmark scenario once against the live sites and saves
+every response; ``synth`` does the same against generated data (a 1,200
+chapter MangaDex series, a 300 page chapter, an NHentai gallery). ``run``
+serves the fixtures from 127.0.0.1 and points MangaDexAPI/NHentaiAPI at it
+through ``host_overrides``, so results do not depend on the network.
+
+Searches, chapter lists and page turns go through the app's own
+LibraryService and ReaderSession. Rate limiting and the response/disk
+caches are left out: the benchmark measures the client, decode and
+prefetch path, not the politeness budget.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from PIL import Image
+
+from http_transport import SyncTransport
+from image_cache import ImageCache
+from manga_api import ChapterInfo, MangaDexAPI, MangaResult
+from nhentai_api import NHentaiAPI
+from progress_store import ProgressStore
+from reader_core import DEFAULT_BOX, LibraryService
+from telemetry import telemetry
+from workers import WorkerPool
+
+READER_BOX = DEFAULT_BOX
+RSS_SAMPLE_PAGES = 100
+
+
+def fixture_key(url: str) -> str:
+    """``host/path?query`` with the query sorted, so parameter order does not matter."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.hostname}{parts.path}" + (f"?{query}" if query else "")
+
+
+class FixtureStore:
+    """``index.json`` maps fixture keys to content-addressed bodies under ``bodies/``."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self.index: dict[str, dict] = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+
+    def add(self, url: str, body: bytes, content_type: str) -> None:
+        digest = hashlib.sha1(body).hexdigest()
+        path = os.path.join(self.root, "bodies", digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(body)
+            self.index[fixture_key(url)] = {"body": digest, "type": content_type}
+
+    def lookup(self, key: str) -> tuple[bytes, str] | None:
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self.root, "bodies", entry["body"]), "rb") as f:
+            return f.read(), entry["type"]
+
+    def hosts(self) -> set[str]:
+        return {key.split("/", 1)[0] for key in self.index}
+
+    def save(self, scenario: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._index_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        with open(os.path.join(self.root, "scenario.json"), "w", encoding="utf-8") as f:
+            json.dump(scenario, f, indent=2)
+
+
+class RecordingTransport:
+    """Passes requests through to ``inner`` and stores every 200 response."""
+
+    def __init__(self, inner, store: FixtureStore):
+        self.inner = inner
+        self.store = store
+
+    def get(self, url: str, params=None, headers=None, timeout: float | None = None, stream: bool = False):
+        r = self.inner.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+        if r.status_code == 200:
+            # Reading .content up front still leaves iter_content working
+            self.store.add(r.url, r.content, r.headers.get("Content-Type", "application/octet-stream"))
+        return r
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+# --- Synthetic fixtures ------------------------------------------------------
+
+class _SynthResponse:
+    def __init__(self, url: str, body: bytes, content_type: str):
+        self.url = url
+        self.content = body
+        self.status_code = 200
+        self.headers = {"Content-Type": content_type}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int | None = None):
+        step = chunk_size or len(self.content) or 1
+        for i in range(0, len(self.content), step):
+            yield self.content[i:i + step]
+
+    def close(self) -> None:
+        pass
+
+
+class SynthTransport:
+    """Fabricates plausible MangaDex/NHentai responses for the benchmark scenario."""
+
+    def __init__(self, chapters: int, pages: int):
+        self.chapters = chapters
+        self.pages = pages
+        img = Image.effect_noise((1400, 2000), 40).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=85)
+        self._jpeg = buf.getvalue()
+
+    def get(self, url: str, params=None, headers=None, timeout: float | None = None, stream: bool = False):
+        if params:
+            url += "?" + urlencode(params, doseq=True)
+        parts = urlsplit(url)
+        q = dict(parse_qsl(parts.query))
+        path = parts.path
+        if parts.hostname == "api.mangadex.org":
+            if path == "/manga":
+                body = self._md_search(int(q.get("limit", 20)))
+            elif path.endswith("/feed"):
+                body = self._md_feed(int(q.get("offset", 0)), int(q.get("limit", 500)))
+            elif path.startswith("/at-home/server/"):
+                body = {"chapter": {"hash": "bench", "data": [f"{i + 1}.jpg" for i in range(self.pages)]}}
+            else:
+                raise ValueError(f"no synthetic fixture for {url}")
+            return _SynthResponse(url, json.dumps(body).encode(), "application/json")
+        if parts.hostname == "nhentai.net":
+            if path == "/api/galleries/search":
+                body = {"result": [self._nh_gallery(i) for i in range(25)], "num_pages": 40, "per_page": 25}
+            else:
+                body = self._nh_gallery(int(path.rsplit("/", 1)[1]))
+            return _SynthResponse(url, json.dumps(body).encode(), "application/json")
+        return _SynthResponse(url, self._jpeg, "image/jpeg")
+
+    def close(self) -> None:
+        pass
+
+    def _md_search(self, limit: int) -> dict:
+        data = [
+            {
+                "id": f"00000000-0000-0000-0000-{i:012d}",
+                "attributes": {
+                    "title": {"en": f"Benchmark Series {i}"},
+                    "description": {"en": "Synthetic fixture. " * 20},
+                    "status": "ongoing",
+                    "year": 2020,
+                    "tags": [{"attributes": {"name": {"en": t}}} for t in ("Action", "Drama", "Romance")],
+                },
+                "relationships": [{"type": "cover_art", "attributes": {"fileName": f"cover{i}.jpg"}}],
+            }
+            for i in range(limit)
+        ]
+        return {"data": data, "total": 10_000}
+
+    def _md_feed(self, offset: int, limit: int) -> dict:
+        data = [
+            {
+                "id": f"10000000-0000-0000-0000-{i:012d}",
+                "attributes": {
+                    "chapter": str(i + 1),
+                    "volume": str(i // 10 + 1),
+                    "title": f"Chapter {i + 1}",
+                    "translatedLanguage": "en",
+                },
+            }
+            for i in range(offset, min(offset + limit, self.chapters))
+        ]
+        return {"data": data, "total": self.chapters}
+
+    def _nh_gallery(self, gid: int) -> dict:
+        return {
+            "id": gid,
+            "media_id": str(100000 + gid),
+            "title": {"english": f"Benchmark Gallery {gid}"},
+            "images": {"cover": {"t": "j"}, "pages": [{"t": "j"} for _ in range(self.pages)]},
+            "tags": [{"name": "benchmark"}],
+        }
+
+
+# --- Stub server ---------------------------------------------------------------
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real CDNs
+    # Headers and body are separate writes; with Nagle on, delayed ACKs add ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        # Requests arrive as /<original host>/<path>?<query> (see host_overrides)
+        found = self.server.store.lookup(fixture_key("http:/" + self.path))
+        if found is None:
+            self.send_error(404)
+            return
+        body, content_type = found
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(store: FixtureStore) -> tuple[ThreadingHTTPServer, dict[str, str]]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.store = store
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, {host: f"{base}/{host}" for host in store.hosts()}
+
+
+# --- Measurements --------------------------------------------------------------
+
+def current_rss() -> int | None:
+    """Resident set size in bytes, where the platform makes it cheap to read."""
+    if sys.platform == "win32":
+        return _win_memory_info()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def peak_rss() -> int | None:
+    if sys.platform == "win32":
+        return _win_memory_info()[1]
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _win_memory_info() -> tuple[int, int]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+        ] + [(name, ctypes.c_size_t) for name in (
+            "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+            "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+        )]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+    )
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds (nearest-rank percentiles)."""
+    s = sorted(samples)
+
+    def pct(p: float) -> float:
+        return _ms(s[min(len(s) - 1, max(0, round(p / 100 * len(s)) - 1))])
+
+    return {
+        "n": len(s),
+        "mean_ms": _ms(sum(s) / len(s)),
+        "p50_ms": pct(50),
+        "p99_ms": pct(99),
+        "max_ms": _ms(s[-1]),
+    }
+
+
+def _timed(fn, repeat: int) -> tuple[list[float], object]:
+    samples, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return samples, result
+
+
+def _library(mangadex: MangaDexAPI, nhentai: NHentaiAPI, pool: WorkerPool) -> LibraryService:
+    """The app's LibraryService with its cache budgets; progress is kept in memory."""
+    return LibraryService(
+        {"mangadex": mangadex, "nhentai": nhentai},
+        pool,
+        ProgressStore(":memory:"),
+        ImageCache(256 * 1024 * 1024),
+        ImageCache(32 * 1024 * 1024),
+        ImageCache(192 * 1024 * 1024),
+    )
+
+
+def _raise(e: Exception):
+    raise e
+
+
+def bench_search(library: LibraryService, source: str, query: str, repeat: int) -> dict:
+    samples, _ = _timed(lambda: library.search(source, query, True, lambda *a: None, _raise).result(), repeat)
+    return summarize(samples)
+
+
+def bench_chapters(library: LibraryService, manga: MangaResult, repeat: int) -> dict:
+    found: list[ChapterInfo] = []
+
+    def done(chapters: list[ChapterInfo]) -> None:
+        found[:] = chapters
+
+    samples, _ = _timed(lambda: library.load_chapters(manga, done, _raise).result(), repeat)
+    return summarize(samples) | {"chapters": len(found)}
+
+
+def bench_reader(library: LibraryService, manga: MangaResult, chapter: ChapterInfo,
+                 pages: int, dwell: float) -> dict:
+    """Open a chapter and turn through it with the reader's own ReaderSession."""
+    shown: dict[int, object] = {}
+    cond = threading.Condition()
+
+    def arrived(idx: int, value) -> None:
+        with cond:
+            shown[idx] = value
+            cond.notify_all()
+
+    def wait_for(idx: int) -> None:
+        with cond:
+            if not cond.wait_for(lambda: idx in shown, timeout=60):
+                raise TimeoutError(f"page {idx} did not load")
+        if isinstance(shown[idx], Exception):
+            raise shown[idx]
+
+    t0 = time.perf_counter()
+    opened: list = []
+    library.open_chapter(manga, chapter, lambda *r: opened.extend(r), _raise, initial_page=0).result()
+    api, urls, _ = opened
+    session = library.session(
+        manga, chapter, api, urls[:pages],
+        box=READER_BOX, on_page=arrived, on_error=arrived,
+    )
+    session.start()
+    wait_for(0)
+    first_page = time.perf_counter() - t0
+
+    turns, rss = [], [current_rss()]
+    for idx in range(1, session.page_count):
+        if dwell:
+            time.sleep(dwell)
+        t = time.perf_counter()
+        session.goto(idx)
+        wait_for(idx)
+        turns.append(time.perf_counter() - t)
+        if (idx + 1) % RSS_SAMPLE_PAGES == 0:
+            rss.append(current_rss())
+    session.close()
+
+    result = {"pages": session.page_count, "time_to_first_page_ms": _ms(first_page)}
+    if turns:
+        result["page_turn"] = summarize(turns)
+    if None not in rss and len(rss) > 1:
+        growth = [b - a for a, b in zip(rss, rss[1:])]
+        result["rss_growth_per_100_pages_mb"] = [round(g / 2**20, 1) for g in growth]
+    return result
+
+
+def _manga(source: str, manga_id: str) -> MangaResult:
+    return MangaResult(id=manga_id, title="", description="", cover_url="",
+                       status="", year=None, tags=[], source=source)
+
+
+def _chapter(chapter_id: str) -> ChapterInfo:
+    return ChapterInfo(id=chapter_id, chapter="1", title="", volume=None)
+
+
+def run_scenario(mangadex: MangaDexAPI, nhentai: NHentaiAPI, scenario: dict,
+                 repeat: int = 1, pages: int = 300, dwell: float = 0.0) -> dict:
+    """The benchmark scenario; ``record``/``synth`` run it once to capture fixtures."""
+    pool = WorkerPool(max_workers=8, per_host=4)
+    library = _library(mangadex, nhentai, pool)
+    results: dict = {}
+    md, nh = scenario.get("mangadex"), scenario.get("nhentai")
+    if md:
+        manga = _manga("mangadex", md["manga_id"])
+        results["mangadex_search"] = bench_search(library, "mangadex", md["query"], repeat)
+        results["mangadex_chapter_list"] = bench_chapters(library, manga, repeat)
+        results["mangadex_reader"] = bench_reader(library, manga, _chapter(md["chapter_id"]), pages, dwell)
+    if nh:
+        manga = _manga("nhentai", nh["gallery_id"])
+        results["nhentai_search"] = bench_search(library, "nhentai", nh["query"], repeat)
+        results["nhentai_reader"] = bench_reader(library, manga, _chapter(nh["gallery_id"]), pages, dwell)
+    library.progress.close()
+    pool.shutdown()
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def cmd_run(args) -> dict:
+    store = FixtureStore(args.fixtures)
+    with open(os.path.join(args.fixtures, "scenario.json"), encoding="utf-8") as f:
+        scenario = json.load(f)
+    server, overrides = start_stub_server(store)
+    try:
+        mangadex = MangaDexAPI(transport=SyncTransport(MangaDexAPI.HEADERS, overrides))
+        nhentai = NHentaiAPI(transport=SyncTransport(NHentaiAPI.HEADERS, overrides))
+        results = run_scenario(mangadex, nhentai, scenario, args.repeat, args.pages, args.dwell)
+    finally:
+        server.shutdown()
+    peak = peak_rss()
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixtures": os.path.abspath(args.fixtures),
+            "repeat": args.repeat,
+            "pages": args.pages,
+            "dwell_s": args.dwell,
+        },
+        "results": results,
+        "peak_rss_mb": round(peak / 2**20, 1) if peak else None,
+        # Per-stage breakdown (fetch/decode/resize/queue wait) over the whole run
+        "spans": telemetry.snapshot()["spans"],
+    }
+
+
+def cmd_capture(args, inner_md, inner_nh, scenario: dict) -> None:
+    store = FixtureStore(args.fixtures)
+    mangadex = MangaDexAPI(transport=RecordingTransport(inner_md, store))
+    nhentai = NHentaiAPI(transport=RecordingTransport(inner_nh, store))
+    run_scenario(mangadex, nhentai, scenario, pages=args.pages)
+    store.save(scenario)
+    print(f"{len(store.index)} fixtures written to {args.fixtures}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="replay fixtures and write timings as JSON")
+    p.add_argument("fixtures")
+    p.add_argument("--out", help="result file (default: print)")
+    p.add_argument("--repeat", type=int, default=20, help="runs per search/chapter-list measurement")
+    p.add_argument("--pages", type=int, default=300, help="pages to turn through per reader run")
+    p.add_argument("--dwell", type=float, default=0.0, help="seconds spent on each page before turning")
+
+    p = sub.add_parser("synth", help="generate synthetic fixtures")
+    p.add_argument("fixtures")
+    p.add_argument("--chapters", type=int, default=1200)
+    p.add_argument("--pages", type=int, default=300)
+
+    p = sub.add_parser("record", help="record fixtures from the live sites")
+    p.add_argument("fixtures")
+    p.add_argument("--query", default="love")
+    p.add_argument("--manga-id", help="MangaDex series with many chapters")
+    p.add_argument("--chapter-id", help="MangaDex chapter to page through")
+    p.add_argument("--gallery-id", help="NHentai gallery to page through")
+    p.add_argument("--pages", type=int, default=300)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = cmd_run(args)
+        text = json.dumps(report, indent=2)
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        print(text)
+    elif args.command == "synth":
+        synth = SynthTransport(args.chapters, args.pages)
+        cmd_capture(args, synth, synth, {
+            "mangadex": {
+                "query": "benchmark",
+                "manga_id": "00000000-0000-0000-0000-000000000000",
+                "chapter_id": "10000000-0000-0000-0000-000000000000",
+            },
+            "nhentai": {"query": "benchmark", "gallery_id": "1"},
+        })
+    else:
+        scenario = {}
+        if args.manga_id and args.chapter_id:
+            scenario["mangadex"] = {"query": args.query, "manga_id": args.manga_id, "chapter_id": args.chapter_id}
+        if args.gallery_id:
+            scenario["nhentai"] = {"query": args.query, "gallery_id": args.gallery_id}
+        if not scenario:
+            parser.error("record needs --manga-id/--chapter-id and/or --gallery-id")
+        cmd_capture(
+            args,
+            SyncTransport(headers=MangaDexAPI.HEADERS),
+            SyncTransport(headers=NHentaiAPI.HEADERS),
+            scenario,
+        )
+
+
+if __name__ == "__main__":
+    main()
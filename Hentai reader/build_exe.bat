@@ -5,8 +5,17 @@ echo Installing dependencies...
 pip install -r requirements.txt
 pip install pyinstaller
 
-echo Building self-contained executable...
-pyinstaller --onefile --windowed ^
+rem "build_exe.bat onedir" builds a folder instead of a single file. It starts
+rem faster because nothing has to be unpacked to a temp dir on every launch.
+set MODE=--onefile
+set EXE=dist\HentaiMangaReader.exe
+if /I "%~1"=="onedir" (
+    set MODE=--onedir
+    set EXE=dist\HentaiMangaReader\HentaiMangaReader.exe
+)
+
+echo Building executable (%MODE%)...
+pyinstaller %MODE% --windowed ^
     --name "HentaiMangaReader" ^
     --icon app_icon.ico ^
     --add-data "app_icon.ico;." ^
@@ -15,11 +24,16 @@ pyinstaller --onefile --windowed ^
     app.py
 
 echo.
-echo Done! Executable: dist\HentaiMangaReader.exe
+echo Done! Executable: %EXE%
 echo Progress/settings are saved to: %%APPDATA%%\HentaiMangaReader\
 echo.
+if /I "%~1"=="onedir" (
+    echo Keep the dist\HentaiMangaReader folder together; make a Desktop shortcut to the EXE inside it.
+    goto end
+)
 echo Copying to Desktop...
 copy "dist\HentaiMangaReader.exe" "%USERPROFILE%\Desktop\HentaiMangaReader.exe"
 if %ERRORLEVEL%==0 (echo Success! HentaiMangaReader.exe is on your desktop.) else (echo Copy failed - manually copy from dist folder.)
+:end
 echo.
 pause
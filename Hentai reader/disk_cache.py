@@ -0,0 +1,139 @@
+"""Persistent content-addressed cache for downloaded page and cover bytes."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class DiskCache:
+    """Size-capped LRU cache of raw bytes on disk, keyed by (source, url).
+
+    Files live at ``root/ab/cd/<sha256>`` so no directory grows past a few
+    hundred entries even with 100k+ cached images. Writes go to a temp file
+    in the same directory and are moved into place with ``os.replace``, so a
+    crash never leaves a truncated entry behind. Recency is the file mtime,
+    touched on every hit; the in-memory index is rebuilt from it by a
+    background scan at startup.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self._ready = False
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        threading.Thread(target=self._scan, daemon=True).start()
+
+    @staticmethod
+    def key(source: str, url: str) -> str:
+        return hashlib.sha256(f"{source}\0{url}".encode("utf-8")).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def get(self, source: str, url: str) -> bytes | None:
+        digest = self.key(source, url)
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            if digest in self._index:
+                self._index.move_to_end(digest)
+        return data
+
+    def __contains__(self, item: tuple[str, str]) -> bool:
+        return os.path.exists(self._path(self.key(*item)))
+
+    def put(self, source: str, url: str, data: bytes) -> None:
+        digest = self.key(source, url)
+        path = self._path(digest)
+        shard = os.path.dirname(path)
+        try:
+            os.makedirs(shard, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=shard, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            return
+        with self._lock:
+            old = self._index.pop(digest, None)
+            if old is not None:
+                self._bytes -= old
+            self._index[digest] = len(data)
+            self._bytes += len(data)
+            victims = self._collect_victims()
+        self._remove(victims)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def _scan(self) -> None:
+        found = []
+        try:
+            for top in os.scandir(self.root):
+                if not top.is_dir():
+                    continue
+                for sub in os.scandir(top.path):
+                    if not sub.is_dir():
+                        continue
+                    for entry in os.scandir(sub.path):
+                        if entry.name.endswith(".tmp"):
+                            # Left over from an interrupted write
+                            try:
+                                os.remove(entry.path)
+                            except OSError:
+                                pass
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        found.append((st.st_mtime, entry.name, st.st_size))
+        except OSError:
+            pass
+        found.sort()
+        with self._lock:
+            # Entries written while scanning are newer than anything on disk
+            recent = self._index
+            self._index = OrderedDict((name, size) for _, name, size in found if name not in recent)
+            self._index.update(recent)
+            self._bytes = sum(self._index.values())
+            self._ready = True
+            victims = self._collect_victims()
+        self._remove(victims)
+
+    def _collect_victims(self) -> list[str]:
+        # Caller holds the lock. Nothing is evicted until the scan has run,
+        # since sizes of older files are not known yet.
+        victims = []
+        if not self._ready:
+            return victims
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            digest, size = self._index.popitem(last=False)
+            self._bytes -= size
+            victims.append(digest)
+        return victims
+
+    def _remove(self, digests: list[str]) -> None:
+        for digest in digests:
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
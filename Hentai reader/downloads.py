@@ -0,0 +1,300 @@
+"""Background chapter/gallery downloads into CBZ archives, resumable per page."""
+
+import html
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import wait
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from manga_api import MangaResult, ChapterInfo
+from workers import WorkerPool, host_of, PRIORITY_DOWNLOAD
+
+
+@dataclass
+class DownloadTask:
+    source: str
+    manga_id: str
+    manga_title: str
+    chapter_id: str
+    chapter: str
+    state: str = "queued"  # queued, running, done, failed, cancelled
+    pages_total: int = 0
+    pages_done: int = 0
+    error: str = ""
+    # Progress of the current run only, for throughput/ETA
+    run_started: float = 0.0
+    run_bytes: int = 0
+    run_pages: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.source}:{self.chapter_id}"
+
+    def throughput(self) -> float:
+        """Bytes per second since this run started."""
+        elapsed = time.monotonic() - self.run_started
+        return self.run_bytes / elapsed if self.run_started and elapsed > 0 else 0.0
+
+    def eta(self) -> float | None:
+        """Seconds left, estimated from the average page size and throughput so far."""
+        rate = self.throughput()
+        if not rate or not self.run_pages:
+            return None
+        remaining = self.pages_total - self.pages_done
+        return remaining * (self.run_bytes / self.run_pages) / rate
+
+    def summary(self) -> str:
+        label = f"{self.manga_title} Ch. {self.chapter}"
+        if self.state == "running":
+            eta = self.eta()
+            speed = self.throughput() / 1024
+            tail = f", {speed:.0f} KB/s" + (f", {eta:.0f}s left" if eta is not None else "")
+            return f"Downloading {label}: {self.pages_done}/{self.pages_total}{tail}"
+        if self.state == "failed":
+            return f"Download failed: {label} ({self.error})"
+        return f"{self.state.capitalize()}: {label}"
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+class DownloadManager:
+    """Queues chapters and writes each one to ``root/<source>/<manga_id>/<chapter_id>.cbz``.
+
+    Chapters download one at a time; their pages go through the shared
+    WorkerPool at the lowest priority, so per-host limits bound concurrency
+    and reading always wins. Each finished page is written to
+    ``root/.partial/<task>/`` as a checkpoint; after a crash or restart
+    ``resume_pending`` re-queues those tasks and only missing pages are
+    fetched.
+    """
+
+    def __init__(self, root: str, apis: dict[str, object], pool: WorkerPool, on_update=None):
+        self.root = root
+        self.apis = apis
+        self.pool = pool
+        self.on_update = on_update
+        self._partial_root = os.path.join(root, ".partial")
+        self._tasks: dict[str, DownloadTask] = {}
+        self._queue: queue.Queue[DownloadTask] = queue.Queue()
+        self._lock = threading.Lock()
+        os.makedirs(self._partial_root, exist_ok=True)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def archive_path(self, source: str, manga_id: str, chapter_id: str) -> str:
+        return os.path.join(self.root, _safe(source), _safe(manga_id), f"{_safe(chapter_id)}.cbz")
+
+    def is_downloaded(self, source: str, manga_id: str, chapter_id: str) -> bool:
+        return os.path.exists(self.archive_path(source, manga_id, chapter_id))
+
+    def tasks(self) -> list[DownloadTask]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def task_for(self, source: str, chapter_id: str) -> DownloadTask | None:
+        with self._lock:
+            return self._tasks.get(f"{source}:{chapter_id}")
+
+    def enqueue(self, manga: MangaResult, chapter: ChapterInfo) -> DownloadTask:
+        task = DownloadTask(
+            source=manga.source,
+            manga_id=manga.id,
+            manga_title=manga.title,
+            chapter_id=chapter.id,
+            chapter=chapter.chapter,
+        )
+        return self._add(task)
+
+    def resume_pending(self) -> int:
+        """Re-queue downloads interrupted by a crash or restart."""
+        n = 0
+        for name in os.listdir(self._partial_root):
+            try:
+                with open(os.path.join(self._partial_root, name, "manifest.json"), encoding="utf-8") as f:
+                    m = json.load(f)
+                task = DownloadTask(
+                    source=m["source"],
+                    manga_id=m["manga_id"],
+                    manga_title=m.get("manga_title", ""),
+                    chapter_id=m["chapter_id"],
+                    chapter=m.get("chapter", ""),
+                )
+            except (OSError, ValueError, KeyError):
+                continue
+            self._add(task)
+            n += 1
+        return n
+
+    def cancel(self, task: DownloadTask) -> None:
+        """Stop a download and delete its checkpoint, so it is not resumed."""
+        with task._lock:
+            if task.state == "done":
+                return  # already published
+            running = task.state == "running"
+            task.state = "cancelled"
+        self.pool.cancel_group(f"download:{task.key}", running=True)
+        if not running:
+            # A running one is cleaned up by the download thread once its pages stop
+            self._discard(task)
+        self._notify(task)
+
+    def _discard(self, task: DownloadTask) -> None:
+        shutil.rmtree(self._partial_dir(task), ignore_errors=True)
+
+    def _add(self, task: DownloadTask) -> DownloadTask:
+        with self._lock:
+            existing = self._tasks.get(task.key)
+            if existing is not None and existing.state in ("queued", "running", "done"):
+                return existing
+            self._tasks[task.key] = task
+        self._queue.put(task)
+        self._notify(task)
+        return task
+
+    def _notify(self, task: DownloadTask) -> None:
+        if self.on_update is not None:
+            self.on_update(task)
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                self._download(task)
+            except Exception as e:
+                with task._lock:
+                    cancelled = task.state == "cancelled"
+                    if not cancelled:
+                        task.state = "failed"
+                        task.error = str(e)[:80]
+                if cancelled:
+                    self._discard(task)
+            self._notify(task)
+
+    def _partial_dir(self, task: DownloadTask) -> str:
+        return os.path.join(self._partial_root, _safe(task.key))
+
+    def _load_manifest(self, task: DownloadTask, api) -> dict:
+        pdir = self._partial_dir(task)
+        path = os.path.join(pdir, "manifest.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        urls = api.get_chapter_images(task.chapter_id)
+        if not urls:
+            raise RuntimeError("no pages")
+        files = []
+        for i, url in enumerate(urls):
+            ext = os.path.splitext(urlsplit(url).path)[1].lower() or ".jpg"
+            files.append(f"{i + 1:04d}{ext}")
+        manifest = {
+            "source": task.source,
+            "manga_id": task.manga_id,
+            "manga_title": task.manga_title,
+            "chapter_id": task.chapter_id,
+            "chapter": task.chapter,
+            "urls": urls,
+            "files": files,
+        }
+        os.makedirs(pdir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+        return manifest
+
+    def _download(self, task: DownloadTask) -> None:
+        api = self.apis[task.source]
+        with task._lock:
+            if task.state == "cancelled":
+                self._discard(task)
+                return
+            task.state = "running"
+        manifest = self._load_manifest(task, api)
+        pdir = self._partial_dir(task)
+        urls, files = manifest["urls"], manifest["files"]
+        task.pages_total = len(urls)
+        task.pages_done = sum(1 for name in files if os.path.exists(os.path.join(pdir, name)))
+        task.run_started = time.monotonic()
+        task.run_bytes = task.run_pages = 0
+        self._notify(task)
+
+        def fetch_page(url: str, name: str) -> None:
+            if task.state == "cancelled":
+                return
+            # Not into the disk cache too: the CBZ is this page's copy
+            data = api.fetch_image(url, store=False)
+            tmp = os.path.join(pdir, name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(pdir, name))
+            with task._lock:
+                task.pages_done += 1
+                task.run_pages += 1
+                task.run_bytes += len(data)
+            self._notify(task)
+
+        jobs = [
+            self.pool.submit(
+                fetch_page, url, name,
+                priority=PRIORITY_DOWNLOAD, host=host_of(url), group=f"download:{task.key}",
+            )
+            for url, name in zip(urls, files)
+            if not os.path.exists(os.path.join(pdir, name))
+        ]
+        wait(jobs)
+        if task.state == "cancelled":
+            self._discard(task)
+            return
+        errors = [j.exception() for j in jobs if not j.cancelled() and j.exception() is not None]
+        if errors:
+            # Finished pages stay on disk; the next attempt resumes from them
+            raise RuntimeError(f"{len(errors)} page(s) failed: {errors[0]}")
+        if self._write_cbz(task, manifest, pdir):
+            shutil.rmtree(pdir, ignore_errors=True)
+        else:
+            self._discard(task)
+
+    def _write_cbz(self, task: DownloadTask, manifest: dict, pdir: str) -> bool:
+        """Build the CBZ and publish it, marking the task done, unless it was
+        cancelled meanwhile. Returns whether it was published."""
+        dest = self.archive_path(task.source, task.manga_id, task.chapter_id)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+        os.close(fd)
+        try:
+            # Images are already compressed; storing them keeps page reads zero-copy
+            with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+                for name in manifest["files"]:
+                    zf.write(os.path.join(pdir, name), name)
+                zf.writestr("ComicInfo.xml", (
+                    '<?xml version="1.0" encoding="utf-8"?>\n'
+                    "<ComicInfo>"
+                    f"<Series>{html.escape(task.manga_title, quote=False)}</Series>"
+                    f"<Number>{html.escape(task.chapter, quote=False)}</Number>"
+                    f"<PageCount>{len(manifest['files'])}</PageCount>"
+                    "</ComicInfo>\n"
+                ))
+            with task._lock:
+                if task.state == "cancelled":
+                    os.remove(tmp)
+                    return False
+                os.replace(tmp, dest)
+                task.state = "done"
+            return True
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,269 @@
+"""HTTP transports used by the API clients: blocking requests or asyncio httpx.
+
+Both expose ``get(url, params=None, headers=None, timeout=None, stream=False)``
+returning a response with ``status_code``, ``headers``, ``content``,
+``json()`` and ``raise_for_status()``, so MangaDexAPI/NHentaiAPI do not care
+which one they are given. With ``stream=True`` the body is not read up
+front; use ``iter_content(chunk_size)`` and ``close()`` instead.
+
+``host_overrides`` maps a hostname to a base URL that replaces its scheme and
+host, e.g. ``{"api.mangadex.org": "http://127.0.0.1:8080/mangadex"}``. It is
+how the clients are pointed at a local stub server for offline testing.
+
+requests, asyncio and httpx are imported on first use rather than at import
+time; they are among the slowest imports at startup and the first request
+is made from a worker thread anyway.
+"""
+
+import queue
+import threading
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+
+from telemetry import telemetry
+from workers import check_cancelled
+
+# Read size for streamed image bodies
+IMAGE_CHUNK_SIZE = 32 * 1024
+
+
+def async_available() -> bool:
+    """Whether httpx is installed, without importing it."""
+    return find_spec("httpx") is not None
+
+
+def read_image(transport, url: str, headers=None, timeout: float | None = 30, on_chunk=None) -> bytes:
+    """Stream an image body, calling ``on_chunk(chunk)`` as data arrives.
+
+    An HTML error page served with status 200 is rejected on its first
+    chunk instead of after the whole body has been downloaded. If the
+    calling pool job is aborted, the read stops at the next chunk and the
+    connection is closed rather than drained.
+    """
+    buf = bytearray()
+    with telemetry.span("http.fetch", url=url):
+        r = transport.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            r.raise_for_status()
+            for chunk in r.iter_content(IMAGE_CHUNK_SIZE):
+                check_cancelled()
+                if not buf:
+                    head = chunk[:50].lower()
+                    if b"<!doctype" in head or b"<html" in head:
+                        raise ValueError("Server returned HTML instead of image")
+                buf += chunk
+                if on_chunk is not None:
+                    on_chunk(chunk)
+        finally:
+            r.close()
+    telemetry.count("http.bytes", len(buf))
+    return bytes(buf)
+
+
+def _rewrite(url: str, host_overrides: dict[str, str] | None) -> str:
+    if not host_overrides:
+        return url
+    parts = urlsplit(url)
+    base = host_overrides.get(parts.hostname or "")
+    if base is None:
+        return url
+    rest = parts.path + (f"?{parts.query}" if parts.query else "")
+    return base.rstrip("/") + rest
+
+
+class SyncTransport:
+    """Blocking transport on a pooled keep-alive ``requests.Session``."""
+
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        host_overrides: dict[str, str] | None = None,
+        pool_size: int = 10,
+    ):
+        self.host_overrides = host_overrides
+        self.headers = headers
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The Session, created (and requests imported) on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    if self.headers:
+                        session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def get(self, url: str, params=None, headers=None, timeout: float | None = None, stream: bool = False):
+        return self.session.get(
+            _rewrite(url, self.host_overrides), params=params, headers=headers, timeout=timeout, stream=stream
+        )
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+class EventLoopThread:
+    """One asyncio loop on a daemon thread; the Tk side submits coroutines to it."""
+
+    def __init__(self):
+        import asyncio
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="asyncio-http", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        import asyncio
+
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future."""
+        import asyncio
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float | None = None):
+        """Run a coroutine on the loop and block the calling thread for its result."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class AsyncTransport:
+    """httpx.AsyncClient transport with keep-alive pooling and per-host limits.
+
+    HTTP/2 is negotiated when the ``h2`` package is installed and the server
+    offers it. Blocking ``get`` is for worker threads; coroutines can await
+    ``aget`` directly on ``loop_thread.loop``.
+    """
+
+    def __init__(
+        self,
+        loop_thread: EventLoopThread,
+        headers: dict[str, str] | None = None,
+        host_overrides: dict[str, str] | None = None,
+        per_host: int = 6,
+        max_connections: int = 32,
+        http2: bool = True,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("AsyncTransport needs httpx (pip install httpx[http2])") from None
+        self.loop_thread = loop_thread
+        self.host_overrides = host_overrides
+        self.per_host = per_host
+        self._limits: dict = {}
+
+        async def make_client():
+            return httpx.AsyncClient(
+                headers=headers,
+                http2=http2 and find_spec("h2") is not None,
+                follow_redirects=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            )
+
+        self.client = loop_thread.run(make_client())
+
+    def _limit(self, host: str):
+        # Only touched from the loop thread
+        sem = self._limits.get(host)
+        if sem is None:
+            import asyncio
+
+            sem = self._limits[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def aget(self, url: str, params=None, headers=None, timeout: float | None = None):
+        url = _rewrite(url, self.host_overrides)
+        kwargs = {"params": params, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with self._limit(urlsplit(url).netloc):
+            return await self.client.get(url, **kwargs)
+
+    def get(self, url: str, params=None, headers=None, timeout: float | None = None, stream: bool = False):
+        if stream:
+            return self._stream(url, params, headers, timeout)
+        return self.loop_thread.run(self.aget(url, params=params, headers=headers, timeout=timeout))
+
+    def _stream(self, url: str, params, headers, timeout) -> "_StreamedResponse":
+        """Start a streamed GET; returns once the headers are in and the body
+        keeps arriving on the loop thread."""
+        from concurrent.futures import Future
+
+        url = _rewrite(url, self.host_overrides)
+        kwargs = {"params": params, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        started: Future = Future()
+        chunks: queue.Queue = queue.Queue()
+        closed = threading.Event()
+
+        async def run():
+            try:
+                async with self._limit(urlsplit(url).netloc):
+                    async with self.client.stream("GET", url, **kwargs) as r:
+                        started.set_result(r)
+                        async for chunk in r.aiter_bytes(IMAGE_CHUNK_SIZE):
+                            if closed.is_set():
+                                break
+                            chunks.put(chunk)
+                chunks.put(None)
+            except Exception as e:
+                if started.done():
+                    chunks.put(e)
+                else:
+                    started.set_exception(e)
+
+        self.loop_thread.submit(run())
+        return _StreamedResponse(started.result(timeout), chunks, closed)
+
+    def close(self) -> None:
+        self.loop_thread.run(self.client.aclose())
+
+
+class _StreamedResponse:
+    """Blocking view of an httpx response whose body is read on the loop thread."""
+
+    def __init__(self, response, chunks: queue.Queue, closed: threading.Event):
+        self._response = response
+        self._chunks = chunks
+        self._closed = closed
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def raise_for_status(self) -> None:
+        self._response.raise_for_status()
+
+    def iter_content(self, chunk_size: int | None = None):
+        while True:
+            item = self._chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.iter_content())
+
+    def close(self) -> None:
+        self._closed.set()
@@ -0,0 +1,138 @@
+"""In-memory LRU cache for images, bounded by their size in memory."""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+def image_nbytes(img) -> int:
+    """Decoded size of a PIL image: width x height x bands."""
+    return img.width * img.height * len(img.getbands())
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return image_nbytes(value)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+
+
+class ImageCache:
+    """Thread-safe LRU keyed by string, evicting by total size in memory.
+
+    Values are PIL images (counted as decoded bytes) or compressed image
+    bytes (counted by length).
+
+    Pinned keys are never evicted (the page currently shown by the reader).
+    A single item larger than the budget is still stored; it simply evicts
+    everything else that is not pinned.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._pins: dict[str, int] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            self._items.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def put(self, key: str, img) -> None:
+        size = _sizeof(img)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (img, size)
+            self._bytes += size
+            self._evict()
+
+    __setitem__ = put
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def pin(self, key: str) -> None:
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            n = self._pins.get(key, 0) - 1
+            if n > 0:
+                self._pins[key] = n
+            else:
+                self._pins.pop(key, None)
+            self._evict()
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in [k for k in self._items if k not in self._pins]:
+                self._bytes -= self._items.pop(key)[1]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._items),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def _evict(self) -> None:
+        # Caller holds the lock. Oldest entries are at the front.
+        if self._bytes <= self.max_bytes:
+            return
+        for key in list(self._items):
+            if self._bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._bytes -= self._items.pop(key)[1]
+            self._evictions += 1
@@ -0,0 +1,119 @@
+"""Image decoding, sizing and resampling helpers shared by the reader and cover grid."""
+
+import io
+import time
+
+from PIL import Image, ImageFile, ImageOps
+
+from telemetry import telemetry
+
+
+def fit_size(size: tuple[int, int], box: tuple[int, int]) -> tuple[int, int]:
+    """Largest size that fits ``size`` inside ``box`` keeping aspect, never upscaling."""
+    w, h = size
+    scale = min(box[0] / w, box[1] / h, 1.0)
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def scale_to(img: Image.Image, size: tuple[int, int], fast: bool = False) -> Image.Image:
+    """Resize to ``size``. ``fast`` trades quality for speed (live window drags)."""
+    if img.size == size:
+        return img
+    if fast:
+        return img.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+def decode(data: bytes, box: tuple[int, int] | None = None) -> Image.Image:
+    """Decode to RGB. With ``box``, JPEGs use DCT scaling (draft mode) to decode
+    at the smallest power-of-two reduction still at least as large as the fit
+    size, instead of at full resolution."""
+    img = Image.open(io.BytesIO(data))
+    if box is not None and img.format == "JPEG":
+        img.draft("RGB", fit_size(img.size, box))
+    return img.convert("RGB")
+
+
+def decode_to_fit(data: bytes, box: tuple[int, int], fast: bool = False, kind: str = "page") -> Image.Image:
+    """Decode and scale to fit ``box`` (never upscaling). ``kind`` names the timing spans."""
+    with telemetry.span(f"{kind}.decode"):
+        img = decode(data, box)
+    with telemetry.span(f"{kind}.resize"):
+        return scale_to(img, fit_size(img.size, box), fast=fast)
+
+
+def cover_renditions(data: bytes, box: tuple[int, int], scales: tuple[int, ...] = (1, 2)) -> dict[int, Image.Image]:
+    """The cover cropped to fill ``box`` times each scale, from a single decode.
+
+    Each rendition is exactly the size it is displayed at, so showing it
+    never resamples again.
+    """
+    largest = max(scales)
+    with telemetry.span("cover.decode"):
+        img = Image.open(io.BytesIO(data))
+        if img.format == "JPEG":
+            # Draft keeps both sides at least as large as the biggest rendition
+            img.draft("RGB", (box[0] * largest, box[1] * largest))
+        img = img.convert("RGB")
+    with telemetry.span("cover.resize"):
+        return {
+            s: ImageOps.fit(img, (box[0] * s, box[1] * s), Image.Resampling.LANCZOS)
+            for s in scales
+        }
+
+
+def encode_webp(img: Image.Image, quality: int = 80) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+class ProgressiveDecoder:
+    """Early, coarse renditions of an image that is still downloading.
+
+    ``ImageFile.Parser`` picks up the format and size from the first chunks.
+    Pillow cannot feed JPEG or PNG data to it incrementally, so a preview
+    decodes the bytes received so far with an end-of-image marker
+    appended: baseline JPEGs fill in from the top, progressive ones sharpen
+    as scans arrive. Other formats only show once complete.
+    """
+
+    _EOI = b"\xff\xd9"
+
+    def __init__(self, box: tuple[int, int], min_bytes: int = 48 * 1024, min_interval: float = 0.2):
+        self.box = box
+        self.min_bytes = min_bytes
+        self.min_interval = min_interval
+        self._parser: ImageFile.Parser | None = ImageFile.Parser()
+        self._format: str | None = None
+        self._data = bytearray()
+        self._shown_at = 0
+        self._shown_time = 0.0
+
+    def feed(self, chunk: bytes) -> None:
+        self._data += chunk
+        if self._parser is not None:
+            try:
+                self._parser.feed(bytes(chunk))
+            except OSError:
+                self._parser = None
+                return
+            if self._parser.image is not None:
+                self._format = self._parser.image.format
+                self._parser = None  # header is all we need from it
+
+    def preview(self) -> Image.Image | None:
+        """A fast rendition of what has arrived, or None if not due yet."""
+        if self._format != "JPEG":
+            return None
+        received = len(self._data)
+        now = time.perf_counter()
+        if received - self._shown_at < self.min_bytes or now - self._shown_time < self.min_interval:
+            return None
+        self._shown_at, self._shown_time = received, now
+        try:
+            with telemetry.span("page.preview"):
+                img = decode(bytes(self._data) + self._EOI, self.box)
+                return scale_to(img, fit_size(img.size, self.box), fast=True)
+        except (OSError, SyntaxError, ValueError):
+            return None
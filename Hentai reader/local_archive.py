@@ -0,0 +1,201 @@
+"""Read pages from a local CBZ/zip archive through the same calls as the API clients.
+
+The archive is memory-mapped and only its central directory is parsed on
+open, so opening is independent of archive size. Stored (uncompressed)
+members, which is what CBZ writers normally use for images, are returned
+as memoryview slices of the mapping: no read, no copy, and the OS only
+pages in what is actually viewed. Deflated members are inflated on demand.
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+
+from manga_api import ChapterInfo
+
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp")
+
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD64_LOCATOR = struct.Struct("<4sLQL")
+_EOCD64 = struct.Struct("<4sQ2H2L4Q")
+_CENTRAL = struct.Struct("<4s6H3L5H2L")
+_LOCAL = struct.Struct("<4s5H3L2H")
+
+_STORED = 0
+_DEFLATED = 8
+
+
+class ArchiveError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class _Member:
+    method: int
+    compressed_size: int
+    size: int
+    header_offset: int
+
+
+def _is_page(name: str) -> bool:
+    return not name.endswith("/") and name.lower().endswith(_IMAGE_EXTS)
+
+
+def _natural_key(name: str) -> list:
+    """Sort "page2" before "page10"."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def _zip64_extra(extra: bytes, size: int, csize: int, offset: int) -> tuple[int, int, int]:
+    # Only fields saturated to 0xFFFFFFFF are present, in this order
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack_from("<2H", extra, pos)
+        if tag == 0x0001:
+            vals = iter(struct.unpack_from(f"<{length // 8}Q", extra, pos + 4))
+            if size == 0xFFFFFFFF:
+                size = next(vals)
+            if csize == 0xFFFFFFFF:
+                csize = next(vals)
+            if offset == 0xFFFFFFFF:
+                offset = next(vals)
+            break
+        pos += 4 + length
+    return size, csize, offset
+
+
+class LocalArchiveAPI:
+    """A local archive as a source. Top-level folders are chapters; an archive
+    without folders is a single chapter. Page "URLs" are member names."""
+
+    SOURCE = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file; mmap refuses zero-length mappings
+            self._file.close()
+            raise ArchiveError(f"{path}: not a zip archive")
+        self._view = memoryview(self._map)
+        self._lock = threading.Lock()
+        self._data_offsets: dict[str, int] = {}
+        try:
+            self._members = self._read_central_directory()
+        except (ArchiveError, struct.error) as e:
+            self.close()
+            raise ArchiveError(f"{path}: {e}") from None
+
+    def _read_central_directory(self) -> dict[str, _Member]:
+        m = self._map
+        eocd = m.rfind(b"PK\x05\x06", max(0, len(m) - _EOCD.size - 0xFFFF))
+        if eocd < 0:
+            raise ArchiveError("not a zip archive")
+        _, _, _, _, count, _, cd_offset, _ = _EOCD.unpack_from(m, eocd)
+        loc = eocd - _EOCD64_LOCATOR.size
+        if loc >= 0 and m[loc:loc + 4] == b"PK\x06\x07":
+            _, _, eocd64, _ = _EOCD64_LOCATOR.unpack_from(m, loc)
+            fields = _EOCD64.unpack_from(m, eocd64)
+            count, cd_offset = fields[7], fields[9]
+
+        members: dict[str, _Member] = {}
+        pos = cd_offset
+        for _ in range(count):
+            (sig, _, _, flags, method, _, _, _, csize, size,
+             name_len, extra_len, comment_len, _, _, _, offset) = _CENTRAL.unpack_from(m, pos)
+            if sig != b"PK\x01\x02":
+                raise ArchiveError("corrupt central directory")
+            pos += _CENTRAL.size
+            raw = m[pos:pos + name_len]
+            name = raw.decode("utf-8" if flags & 0x800 else "cp437")
+            extra = m[pos + name_len:pos + name_len + extra_len]
+            size, csize, offset = _zip64_extra(extra, size, csize, offset)
+            members[name] = _Member(method, csize, size, offset)
+            pos += name_len + extra_len + comment_len
+        return members
+
+    @property
+    def title(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def page_names(self, folder: str | None = None) -> list[str]:
+        names = [n for n in self._members if _is_page(n)]
+        if folder == "":
+            names = [n for n in names if "/" not in n]
+        elif folder is not None:
+            names = [n for n in names if n.startswith(folder + "/")]
+        return sorted(names, key=_natural_key)
+
+    def _folders(self) -> list[str]:
+        folders = {n.split("/", 1)[0] for n in self._members if _is_page(n) and "/" in n}
+        return sorted(folders, key=_natural_key)
+
+    def get_manga_chapters(
+        self,
+        manga_id: str,
+        limit: int | None = None,
+        lang: str = "en",
+    ) -> list[ChapterInfo]:
+        """One chapter per top-level folder holding pages, or one for the whole archive.
+
+        Pages beside the folders (a cover.jpg, say) become a chapter "0" of their own.
+        """
+        folders = self._folders()
+        if not folders:
+            return [ChapterInfo(id=self.path, chapter="1", title=self.title, volume=None)]
+        chapters = [
+            ChapterInfo(id=f"{self.path}!{f}", chapter=str(i + 1), title=f, volume=None)
+            for i, f in enumerate(folders)
+        ]
+        if self.page_names(""):
+            chapters.insert(0, ChapterInfo(id=f"{self.path}!", chapter="0", title="Loose pages", volume=None))
+        return chapters[:limit] if limit else chapters
+
+    def get_chapter_images(self, chapter_id: str) -> list[str]:
+        """Member names of a chapter's pages. Ids not from this archive mean every page."""
+        prefix = f"{self.path}!"
+        if chapter_id.startswith(prefix):
+            return self.page_names(chapter_id[len(prefix):])
+        return self.page_names()
+
+    def _data_offset(self, name: str, member: _Member) -> int:
+        offset = self._data_offsets.get(name)
+        if offset is None:
+            # The local header's extra field can differ from the central one
+            sig, *_, name_len, extra_len = _LOCAL.unpack_from(self._map, member.header_offset)
+            if sig != b"PK\x03\x04":
+                raise ArchiveError(f"{self.path}: corrupt entry {name!r}")
+            offset = member.header_offset + _LOCAL.size + name_len + extra_len
+            with self._lock:
+                self._data_offsets[name] = offset
+        return offset
+
+    def fetch_image(self, url: str, on_chunk=None) -> memoryview | bytes:
+        """Page bytes; a zero-copy view into the mapping for stored members.
+        ``on_chunk`` is accepted for parity with the network sources and unused."""
+        member = self._members.get(url)
+        if member is None:
+            raise KeyError(url)
+        start = self._data_offset(url, member)
+        data = self._view[start:start + member.compressed_size]
+        if member.method == _STORED:
+            return data
+        if member.method == _DEFLATED:
+            return zlib.decompress(data, -15, member.size or zlib.DEF_BUF_SIZE)
+        raise ArchiveError(f"{self.path}: unsupported compression {member.method} for {url!r}")
+
+    def close(self) -> None:
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Page views are still referenced (e.g. by the page cache); the
+            # mapping is released when the last one is collected
+            pass
+        self._file.close()
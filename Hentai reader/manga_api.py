@@ -1,8 +1,20 @@
 """MangaDex API client for searching manga and fetching chapters/images."""
 
-import requests
 from typing import Optional
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+from disk_cache import DiskCache
+from http_transport import SyncTransport, read_image
+from response_cache import ResponseCache
+from telemetry import telemetry
+from workers import bind, check_cancelled
+
+# /manga/{id}/feed accepts up to 500 entries per request
+FEED_PAGE_SIZE = 500
+# ... and rejects offset + limit past 10,000
+FEED_WINDOW = 10_000
+FEED_CONCURRENCY = 4
 
 
 @dataclass
@@ -27,13 +39,43 @@ class ChapterInfo:
 
 class MangaDexAPI:
     BASE_URL = "https://api.mangadex.org"
+    SOURCE = "mangadex"
+    HEADERS = {
+        "Accept": "application/json",
+        "User-Agent": "HentaiReader/1.0 (desktop app)"
+    }
+    # Response cache per endpoint: (ttl seconds, serve stale while revalidating).
+    # At-home server data goes stale quickly; chapter feeds change rarely.
+    CACHE_POLICY = {
+        "browse": (600, True),
+        "search": (300, False),
+        "feed": (1800, False),
+        "at-home": (300, False),
+    }
+    # Request budgets for the shared RateLimiter: "host[/path-prefix]" -> (per second, burst).
+    # MangaDex allows ~5 req/s per IP and 40/min on /at-home/server.
+    RATE_LIMITS = {
+        "api.mangadex.org": (5.0, 5.0),
+        "api.mangadex.org/at-home/server/": (40 / 60, 10.0),
+        "uploads.mangadex.org": (10.0, 20.0),
+    }
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Accept": "application/json",
-            "User-Agent": "HentaiReader/1.0 (desktop app)"
-        })
+    def __init__(
+        self,
+        disk_cache: DiskCache | None = None,
+        transport=None,
+        response_cache: ResponseCache | None = None,
+    ):
+        """``transport`` is a SyncTransport (default) or AsyncTransport built with HEADERS."""
+        self.disk_cache = disk_cache
+        self.http = transport or SyncTransport(headers=self.HEADERS)
+        self.response_cache = response_cache
+
+    def _get(self, url: str, endpoint: str, **kwargs):
+        if self.response_cache is None:
+            return self.http.get(url, **kwargs)
+        ttl, swr = self.CACHE_POLICY[endpoint]
+        return self.response_cache.get(self.http, url, ttl=ttl, stale_while_revalidate=swr, **kwargs)
 
     def browse_manga(
         self,
@@ -51,7 +93,7 @@ class MangaDexAPI:
         }
         if not include_adult:
             params["contentRating[]"] = ["safe", "suggestive", "erotica", "pornographic"]
-        r = self.session.get(f"{self.BASE_URL}/manga", params=params)
+        r = self._get(f"{self.BASE_URL}/manga", "browse", params=params)
         r.raise_for_status()
         results, total = self._parse_manga_response(r.json(), limit)
         return results[:limit], total
@@ -75,7 +117,7 @@ class MangaDexAPI:
         if not include_adult:
             params["contentRating[]"] = ["safe", "suggestive", "erotica", "pornographic"]
 
-        r = self.session.get(f"{self.BASE_URL}/manga", params=params)
+        r = self._get(f"{self.BASE_URL}/manga", "search", params=params)
         r.raise_for_status()
         return self._parse_manga_response(r.json(), limit)
 
@@ -128,54 +170,78 @@ class MangaDexAPI:
         limit: int | None = None,
         lang: str = "en"
     ) -> list[ChapterInfo]:
-        """Get ALL chapters for a manga (paginated). Pass limit=None for no limit."""
-        chapters = self._fetch_all_chapters(manga_id, lang)
-        if not chapters and lang != "ja":
-            chapters = self._fetch_all_chapters(manga_id, "ja")
-        if not chapters:
-            chapters = self._fetch_all_chapters(manga_id, None)
-        return chapters
-
-    def _fetch_all_chapters(
-        self, manga_id: str, lang: str | None
-    ) -> list[ChapterInfo]:
-        """Fetch all chapters via pagination."""
+        """Get ALL chapters for a manga (paginated). Pass limit=None for no limit.
+
+        Falls back to Japanese, then to every language, when ``lang`` has no
+        chapters. The fallback is resolved from a single unfiltered feed scan,
+        unless the feed is too long for the API to page through unfiltered;
+        then each language is scanned on its own.
+        """
+        first = self._feed_page(manga_id, 0)
+        if first.get("total", 0) > FEED_WINDOW:
+            for choice in (lang, "ja"):
+                items = self._fetch_feed(manga_id, choice)
+                if items:
+                    return self._to_chapters(items)
+            # Only the first FEED_WINDOW entries are reachable
+            return self._to_chapters(self._fetch_feed(manga_id, first=first))
+        items = self._fetch_feed(manga_id, first=first)
+        by_lang: dict[str, list[dict]] = {}
+        for item in items:
+            by_lang.setdefault(item.get("attributes", {}).get("translatedLanguage") or "", []).append(item)
+        for choice in (lang, "ja"):
+            if by_lang.get(choice):
+                return self._to_chapters(by_lang[choice])
+        return self._to_chapters(items)
+
+    def _feed_page(self, manga_id: str, offset: int, lang: str | None = None) -> dict:
+        params = {
+            "limit": FEED_PAGE_SIZE,
+            "offset": offset,
+            "order[volume]": "asc",
+            "order[chapter]": "asc",
+        }
+        if lang:
+            params["translatedLanguage[]"] = [lang]
+        r = self._get(f"{self.BASE_URL}/manga/{manga_id}/feed", "feed", params=params)
+        r.raise_for_status()
+        return r.json()
+
+    def _fetch_feed(self, manga_id: str, lang: str | None = None, first: dict | None = None) -> list[dict]:
+        """Fetch every reachable feed entry. The first page's total drives
+        concurrent fetches of the rest; ``first`` is that page if already fetched."""
+        if first is None:
+            first = self._feed_page(manga_id, 0, lang)
+        items = list(first.get("data", []))
+        total = first.get("total", len(items))
+        # The last page allowed ends exactly at FEED_WINDOW
+        offsets = list(range(FEED_PAGE_SIZE, min(total, FEED_WINDOW), FEED_PAGE_SIZE))
+        if offsets:
+            # The fetches count as the calling job's, so aborting it stops them
+            fetch = bind(lambda offset: self._feed_page(manga_id, offset, lang))
+            with ThreadPoolExecutor(max_workers=FEED_CONCURRENCY) as pool:
+                # map() keeps server order across pages
+                for page in pool.map(fetch, offsets):
+                    check_cancelled()
+                    items.extend(page.get("data", []))
+        return items
+
+    def _to_chapters(self, items: list[dict]) -> list[ChapterInfo]:
         all_chapters = []
         seen = set()
-        limit = 100
-        offset = 0
-
-        while True:
-            params = {
-                "limit": limit,
-                "offset": offset,
-                "order[volume]": "asc",
-                "order[chapter]": "asc",
-            }
-            if lang:
-                params["translatedLanguage[]"] = [lang]
-            r = self.session.get(f"{self.BASE_URL}/manga/{manga_id}/feed", params=params)
-            r.raise_for_status()
-            data = r.json()
-            batch = data.get("data", [])
-            if not batch:
-                break
-            for item in batch:
-                attrs = item.get("attributes", {})
-                ch = attrs.get("chapter") or "0"
-                key = (attrs.get("volume") or "", ch)
-                if key in seen:
-                    continue
-                seen.add(key)
-                all_chapters.append(ChapterInfo(
-                    id=item["id"],
-                    chapter=ch,
-                    title=attrs.get("title") or "",
-                    volume=attrs.get("volume")
-                ))
-            if len(batch) < limit:
-                break
-            offset += limit
+        for item in items:
+            attrs = item.get("attributes", {})
+            ch = attrs.get("chapter") or "0"
+            key = (attrs.get("volume") or "", ch)
+            if key in seen:
+                continue
+            seen.add(key)
+            all_chapters.append(ChapterInfo(
+                id=item["id"],
+                chapter=ch,
+                title=attrs.get("title") or "",
+                volume=attrs.get("volume")
+            ))
 
         def sort_key(c):
             try:
@@ -186,7 +252,7 @@ class MangaDexAPI:
 
     def get_chapter_images(self, chapter_id: str) -> list[str]:
         """Get image URLs for a chapter. Uses uploads.mangadex.org for reliability."""
-        r = self.session.get(f"{self.BASE_URL}/at-home/server/{chapter_id}")
+        r = self._get(f"{self.BASE_URL}/at-home/server/{chapter_id}", "at-home")
         r.raise_for_status()
         data = r.json()
         ch_data = data["chapter"]
@@ -202,14 +268,22 @@ class MangaDexAPI:
         """Get MangaDex web reader URL for a chapter."""
         return f"https://mangadex.org/chapter/{chapter_id}"
 
-    def fetch_image(self, url: str) -> bytes:
-        """Download image bytes."""
+    def fetch_image(self, url: str, on_chunk=None, store: bool = True) -> bytes:
+        """Download image bytes, served from the disk cache when present.
+        ``on_chunk(chunk)`` sees the body as it streams in. With ``store``
+        off the download is not added to the disk cache (offline chapters
+        keep their own copy)."""
+        if self.disk_cache is not None:
+            data = self.disk_cache.get(self.SOURCE, url)
+            if data is not None:
+                telemetry.count("disk_cache.hit")
+                return data
+            telemetry.count("disk_cache.miss")
         headers = {
             "Referer": "https://mangadex.org/",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
         }
-        r = self.session.get(url, headers=headers, timeout=30)
-        r.raise_for_status()
-        if b"<!doctype" in r.content[:50].lower() or b"<html" in r.content[:50].lower():
-            raise ValueError("Server returned HTML instead of image")
-        return r.content
+        data = read_image(self.http, url, headers=headers, on_chunk=on_chunk)
+        if store and self.disk_cache is not None:
+            self.disk_cache.put(self.SOURCE, url, data)
+        return data
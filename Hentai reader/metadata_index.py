@@ -0,0 +1,173 @@
+"""Offline search over every title the app has seen, in SQLite FTS5."""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from manga_api import MangaResult
+from telemetry import telemetry
+
+log = logging.getLogger(__name__)
+
+# bm25 column weights: a title match outranks a tag match outranks the blurb
+_WEIGHTS = (10.0, 3.0, 1.0)
+_TAG_SEP = ", "  # tags such as "Slice of Life" contain spaces
+
+
+def _terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.casefold())
+
+
+def _match_expr(terms: list[str], column: str | None = None) -> str:
+    """Every term as a prefix match, e.g. ``"big"* "ca"*``."""
+    expr = " ".join(f'"{t}"*' for t in terms)
+    return f"{column} : ({expr})" if column else expr
+
+
+class MetadataIndex:
+    """Title, tags, description, status and year of every MangaResult seen.
+
+    ``add`` runs on worker threads after each browse/search page; ``search``
+    and ``suggest`` are fast enough for the Tk thread and never touch the
+    network. Ranking is FTS5 bm25 with prefix matching; where SQLite was
+    built without FTS5 a plain LIKE scan is used instead.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manga ("
+            " id INTEGER PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " manga_id TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " tags TEXT NOT NULL,"
+            " description TEXT NOT NULL,"
+            " cover_url TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " year INTEGER,"
+            " seen_at REAL NOT NULL,"
+            " UNIQUE (source, manga_id)"
+            ")"
+        )
+        self.fts = self._create_fts()
+
+    def _create_fts(self) -> bool:
+        try:
+            self._conn.executescript(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS manga_fts USING fts5("
+                " title, tags, description,"
+                " content='manga', content_rowid='id',"
+                " tokenize='unicode61 remove_diacritics 2', prefix='2 3');"
+                # Keep the external-content index in step with the table
+                "CREATE TRIGGER IF NOT EXISTS manga_ai AFTER INSERT ON manga BEGIN"
+                " INSERT INTO manga_fts (rowid, title, tags, description)"
+                " VALUES (new.id, new.title, new.tags, new.description); END;"
+                "CREATE TRIGGER IF NOT EXISTS manga_ad AFTER DELETE ON manga BEGIN"
+                " INSERT INTO manga_fts (manga_fts, rowid, title, tags, description)"
+                " VALUES ('delete', old.id, old.title, old.tags, old.description); END;"
+                "CREATE TRIGGER IF NOT EXISTS manga_au AFTER UPDATE ON manga BEGIN"
+                " INSERT INTO manga_fts (manga_fts, rowid, title, tags, description)"
+                " VALUES ('delete', old.id, old.title, old.tags, old.description);"
+                " INSERT INTO manga_fts (rowid, title, tags, description)"
+                " VALUES (new.id, new.title, new.tags, new.description); END;"
+            )
+            return True
+        except sqlite3.OperationalError as e:
+            log.info("FTS5 unavailable (%s); local search falls back to LIKE", e)
+            return False
+
+    def add(self, results: list[MangaResult]) -> None:
+        if not results:
+            return
+        now = time.time()
+        rows = [
+            (m.source, m.id, m.title, _TAG_SEP.join(m.tags), m.description or "", m.cover_url or "",
+             m.status or "", m.year, now)
+            for m in results
+        ]
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    # Upsert rather than REPLACE: an unchanged row keeps its id
+                    # and the update trigger only reindexes what changed
+                    self._conn.executemany(
+                        "INSERT INTO manga (source, manga_id, title, tags, description, cover_url, status, year, seen_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT (source, manga_id) DO UPDATE SET"
+                        " title = excluded.title, tags = excluded.tags, description = excluded.description,"
+                        " cover_url = excluded.cover_url, status = excluded.status, year = excluded.year,"
+                        " seen_at = excluded.seen_at",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                log.warning("Could not index %d results: %s", len(rows), e)
+
+    def search(self, query: str, source: str | None = None, limit: int = 24) -> list[MangaResult]:
+        """Best local matches for ``query``, optionally from one source only."""
+        terms = _terms(query)
+        if not terms:
+            return []
+        with telemetry.span("index.search"):
+            rows = self._query(terms, None, source, limit)
+        return [
+            MangaResult(
+                id=r[1], title=r[2], description=r[4], cover_url=r[5], status=r[6], year=r[7],
+                tags=r[3].split(_TAG_SEP) if r[3] else [], source=r[0],
+            )
+            for r in rows
+        ]
+
+    def suggest(self, prefix: str, source: str | None = None, limit: int = 8) -> list[str]:
+        """Titles starting words with what has been typed so far."""
+        terms = _terms(prefix)
+        if not terms:
+            return []
+        with telemetry.span("index.suggest"):
+            rows = self._query(terms, "title", source, limit * 2)
+        titles = list(dict.fromkeys(r[2] for r in rows))
+        return titles[:limit]
+
+    def _query(self, terms: list[str], column: str | None, source: str | None, limit: int) -> list[tuple]:
+        cols = "m.source, m.manga_id, m.title, m.tags, m.description, m.cover_url, m.status, m.year"
+        where_source = " AND m.source = ?" if source else ""
+        extra = (source,) if source else ()
+        with self._lock:
+            if self.fts:
+                try:
+                    return self._conn.execute(
+                        f"SELECT {cols} FROM manga_fts JOIN manga m ON m.id = manga_fts.rowid"
+                        f" WHERE manga_fts MATCH ?{where_source}"
+                        f" ORDER BY bm25(manga_fts, {', '.join(map(str, _WEIGHTS))}) LIMIT ?",
+                        (_match_expr(terms, column), *extra, limit),
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    log.warning("FTS query failed, using LIKE: %s", e)
+            fields = [column] if column else ["title", "tags", "description"]
+            conds = " AND ".join(
+                "(" + " OR ".join(f"m.{f} LIKE ? ESCAPE '\\'" for f in fields) + ")" for _ in terms
+            )
+            args = [f"%{_escape_like(t)}%" for t in terms for _ in fields]
+            try:
+                return self._conn.execute(
+                    f"SELECT {cols} FROM manga m WHERE {conds}{where_source}"
+                    " ORDER BY (m.title LIKE ? ESCAPE '\\') DESC, m.seen_at DESC LIMIT ?",
+                    (*args, *extra, f"{_escape_like(terms[0])}%", limit),
+                ).fetchall()
+            except sqlite3.Error as e:
+                log.warning("Local search failed: %s", e)
+                return []
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -1,10 +1,13 @@
 """NHentai API client - adult doujinshi/manga source."""
 
-import requests
 from typing import Optional
 from dataclasses import dataclass, field
 
 from manga_api import MangaResult, ChapterInfo
+from disk_cache import DiskCache
+from http_transport import SyncTransport, read_image
+from response_cache import ResponseCache
+from telemetry import telemetry
 
 
 # Image extension from NHentai type: j=jpg, p=png, g=gif
@@ -15,14 +18,42 @@ class NHentaiAPI:
     """NHentai.net API - galleries are single complete works (no chapters)."""
 
     BASE = "https://nhentai.net/api"
-
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Accept": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": "https://nhentai.net/",
-        })
+    SOURCE = "nhentai"
+    HEADERS = {
+        "Accept": "application/json",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Referer": "https://nhentai.net/",
+    }
+    # Response cache per endpoint: (ttl seconds, serve stale while revalidating).
+    # Galleries never change once published.
+    CACHE_POLICY = {
+        "browse": (600, True),
+        "search": (300, False),
+        "gallery": (24 * 3600, False),
+    }
+    # Request budgets for the shared RateLimiter: "host[/path-prefix]" -> (per second, burst)
+    RATE_LIMITS = {
+        "nhentai.net": (3.0, 6.0),
+        "t.nhentai.net": (10.0, 20.0),
+        "i.nhentai.net": (10.0, 20.0),
+    }
+
+    def __init__(
+        self,
+        disk_cache: DiskCache | None = None,
+        transport=None,
+        response_cache: ResponseCache | None = None,
+    ):
+        """``transport`` is a SyncTransport (default) or AsyncTransport built with HEADERS."""
+        self.disk_cache = disk_cache
+        self.http = transport or SyncTransport(headers=self.HEADERS)
+        self.response_cache = response_cache
+
+    def _get(self, url: str, endpoint: str, **kwargs):
+        if self.response_cache is None:
+            return self.http.get(url, **kwargs)
+        ttl, swr = self.CACHE_POLICY[endpoint]
+        return self.response_cache.get(self.http, url, ttl=ttl, stale_while_revalidate=swr, **kwargs)
 
     def browse_manga(
         self,
@@ -48,8 +79,9 @@ class NHentaiAPI:
         else:
             params["query"] = "all"  # Empty browse uses "all" to list galleries
         try:
-            r = self.session.get(
+            r = self._get(
                 f"{self.BASE}/galleries/search",
+                "search" if query else "browse",
                 params=params,
                 timeout=15,
             )
@@ -108,7 +140,7 @@ class NHentaiAPI:
     def get_chapter_images(self, chapter_id: str) -> list[str]:
         """Get image URLs for a gallery (chapter_id = gallery id)."""
         try:
-            r = self.session.get(f"{self.BASE}/gallery/{chapter_id}", timeout=15)
+            r = self._get(f"{self.BASE}/gallery/{chapter_id}", "gallery", timeout=15)
             r.raise_for_status()
             data = r.json()
         except Exception:
@@ -122,10 +154,18 @@ class NHentaiAPI:
             urls.append(f"https://i.nhentai.net/galleries/{media_id}/{i + 1}.{ext}")
         return urls
 
-    def fetch_image(self, url: str) -> bytes:
-        """Download image bytes."""
-        r = self.session.get(url, headers={"Referer": "https://nhentai.net/"}, timeout=30)
-        r.raise_for_status()
-        if b"<!doctype" in r.content[:50].lower() or b"<html" in r.content[:50].lower():
-            raise ValueError("Server returned HTML instead of image")
-        return r.content
+    def fetch_image(self, url: str, on_chunk=None, store: bool = True) -> bytes:
+        """Download image bytes, served from the disk cache when present.
+        ``on_chunk(chunk)`` sees the body as it streams in. With ``store``
+        off the download is not added to the disk cache (offline chapters
+        keep their own copy)."""
+        if self.disk_cache is not None:
+            data = self.disk_cache.get(self.SOURCE, url)
+            if data is not None:
+                telemetry.count("disk_cache.hit")
+                return data
+            telemetry.count("disk_cache.miss")
+        data = read_image(self.http, url, headers={"Referer": "https://nhentai.net/"}, on_chunk=on_chunk)
+        if store and self.disk_cache is not None:
+            self.disk_cache.put(self.SOURCE, url, data)
+        return data
@@ -0,0 +1,145 @@
+"""Reading progress persisted in SQLite (WAL), with debounced writes."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def _source_key(source: str) -> str:
+    return "nhentai" if source == "nhentai" else "mangadex"
+
+
+class ProgressStore:
+    """Last read (chapter_id, page_index) per (source, manga_id).
+
+    ``set`` only updates an in-memory pending map; a timer writes it out
+    ``flush_delay`` seconds later in one transaction, so a burst of page
+    turns costs a single indexed upsert. The old ``progress.json`` is
+    imported once, the first time the database is created.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: str | None = None, flush_delay: float = 1.0):
+        self.db_path = db_path
+        self.flush_delay = flush_delay
+        self._pending: dict[tuple[str, str], tuple[str, int]] = {}
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            " source TEXT NOT NULL,"
+            " manga_id TEXT NOT NULL,"
+            " chapter_id TEXT NOT NULL,"
+            " page_index INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (source, manga_id)"
+            ") WITHOUT ROWID"
+        )
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    def get(self, manga_id: str, source: str) -> tuple[str | None, int]:
+        """Return (chapter_id, page_index) for manga, or (None, 0) if none."""
+        key = (_source_key(source), manga_id)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            try:
+                row = self._conn.execute(
+                    "SELECT chapter_id, page_index FROM progress WHERE source = ? AND manga_id = ?",
+                    key,
+                ).fetchone()
+            except sqlite3.Error as e:
+                log.warning("Could not read progress for %s/%s: %s", key[0], manga_id, e)
+                return None, 0
+        if row is None:
+            return None, 0
+        return row[0], int(row[1])
+
+    def set(self, manga_id: str, source: str, chapter_id: str, page_index: int) -> None:
+        with self._lock:
+            self._pending[(_source_key(source), manga_id)] = (chapter_id, int(page_index))
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write pending updates now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            now = time.time()
+            rows = [(src, mid, ch, page, now) for (src, mid), (ch, page) in self._pending.items()]
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT INTO progress (source, manga_id, chapter_id, page_index, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT (source, manga_id) DO UPDATE SET"
+                        " chapter_id = excluded.chapter_id,"
+                        " page_index = excluded.page_index,"
+                        " updated_at = excluded.updated_at",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                # Keep the pending rows so the next flush retries them
+                log.warning("Could not save progress: %s", e)
+                return
+            self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _migrate_json(self, path: str) -> None:
+        if not os.path.exists(path):
+            return
+        if self._conn.execute("SELECT 1 FROM progress LIMIT 1").fetchone():
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Could not read %s for migration: %s", path, e)
+            return
+        rows = []
+        for manga_id, val in (data.get("nhentai") or {}).items():
+            if isinstance(val, (int, float)):
+                rows.append(("nhentai", manga_id, manga_id, int(val), 0.0))
+        for manga_id, val in (data.get("mangadex") or {}).items():
+            if not isinstance(val, dict):
+                continue
+            if "chapter_id" in val:
+                page = val.get("page_index", 0)
+                rows.append(("mangadex", manga_id, val["chapter_id"],
+                             int(page) if isinstance(page, (int, float)) else 0, 0.0))
+                continue
+            # Older format: {chapter_id: page_index}
+            for ch_id, page in val.items():
+                rows.append(("mangadex", manga_id, ch_id,
+                             int(page) if isinstance(page, (int, float)) else 0, 0.0))
+                break
+        try:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            log.warning("Could not migrate %s: %s", path, e)
+            return
+        try:
+            os.replace(path, path + ".migrated")
+        except OSError:
+            pass
@@ -0,0 +1,252 @@
+"""Shared rate limiting, retry and circuit breaking for outgoing HTTP requests."""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import workers
+
+log = logging.getLogger(__name__)
+
+# Exception class names (anywhere in the MRO) treated as transient network
+# failures, covering both requests and httpx without importing either.
+_TRANSIENT_ERRORS = {"ConnectionError", "Timeout", "TransportError", "TimeoutException"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+
+class TokenBucket:
+    """Classic token bucket. ``reserve`` claims a token and says how long to wait for it."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold every caller back (server said Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; lets one probe through after ``reset_after``."""
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._prober: int | None = None  # thread holding the half-open probe
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_after and not self._probing:
+                self._probing = True
+                self._prober = threading.get_ident()
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_after - (time.monotonic() - self._opened_at))
+
+    def release_probe(self) -> None:
+        """Give the half-open probe back if this thread holds it and its
+        request ended without a verdict (aborted, non-transient error, 429)."""
+        with self._lock:
+            if self._probing and self._prober == threading.get_ident():
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class RateLimiter:
+    """Token buckets per host and per endpoint, plus a circuit breaker per host.
+
+    Limits are keyed ``"host"`` or ``"host/path-prefix"`` with values
+    ``(requests per second, burst)``; a request waits for its host bucket
+    and for the longest matching endpoint bucket.
+    """
+
+    def __init__(self, default: tuple[float, float] = (8.0, 16.0)):
+        self.default = default
+        self._hosts: dict[str, TokenBucket] = {}
+        self._endpoints: dict[str, list[tuple[str, TokenBucket]]] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits: dict[str, tuple[float, float]]) -> None:
+        with self._lock:
+            for key, (rate, burst) in limits.items():
+                host, _, path = key.partition("/")
+                if path:
+                    rules = self._endpoints.setdefault(host, [])
+                    rules.append(("/" + path, TokenBucket(rate, burst)))
+                    rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+                else:
+                    self._hosts[host] = TokenBucket(rate, burst)
+
+    def _host_bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._hosts.get(host)
+            if bucket is None:
+                bucket = self._hosts[host] = TokenBucket(*self.default)
+            return bucket
+
+    def _endpoint_bucket(self, host: str, path: str) -> TokenBucket | None:
+        for prefix, bucket in self._endpoints.get(host, ()):
+            if path.startswith(prefix):
+                return bucket
+        return None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker()
+            return breaker
+
+    def acquire(self, url: str) -> None:
+        """Block until ``url`` may be requested."""
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        wait = self._host_bucket(host).reserve()
+        endpoint = self._endpoint_bucket(host, parts.path)
+        if endpoint is not None:
+            wait = max(wait, endpoint.reserve())
+        if wait > 0:
+            # An aborted job gives up its slot rather than wait for it
+            workers.sleep(wait)
+
+    def back_off(self, url: str, seconds: float) -> None:
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        endpoint = self._endpoint_bucket(host, parts.path)
+        # A throttled endpoint only pauses itself; otherwise pause the host
+        (endpoint or self._host_bucket(host)).block_for(seconds)
+
+
+def _retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _is_transient(err: Exception) -> bool:
+    return isinstance(err, OSError) or any(c.__name__ in _TRANSIENT_ERRORS for c in type(err).__mro__)
+
+
+class RetryingTransport:
+    """Wraps a transport with rate limiting, retries and per-host circuit breaking.
+
+    429 and 503 honour Retry-After; other 5xx responses and connection
+    errors are retried with jittered exponential backoff. When retries run
+    out, the last response is returned (the caller's raise_for_status
+    reports it) or the last error is re-raised.
+    """
+
+    def __init__(self, inner, limiter: RateLimiter, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.inner = inner
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def get(self, url: str, params=None, headers=None, timeout: float | None = None, stream: bool = False):
+        host = urlsplit(url).hostname or ""
+        breaker = self.limiter.breaker(host)
+        attempt = 0
+        while True:
+            workers.check_cancelled()
+            if not breaker.allow():
+                raise CircuitOpenError(f"{host} is failing, retrying in {breaker.retry_in():.0f}s")
+            # Every exit that neither succeeds nor fails hands the probe back
+            settled = False
+            try:
+                self.limiter.acquire(url)
+                try:
+                    r = self.inner.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+                except Exception as e:
+                    if not _is_transient(e):
+                        raise
+                    breaker.record_failure()
+                    settled = True
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    log.info("%s on %s, retry %d in %.1fs", type(e).__name__, url, attempt + 1, delay)
+                else:
+                    status = r.status_code
+                    if status == 429 or status >= 500:
+                        if status >= 500:
+                            breaker.record_failure()
+                            settled = True
+                        if attempt >= self.max_retries:
+                            return r
+                        delay = _retry_after(r.headers.get("Retry-After")) if status in (429, 503) else None
+                        if delay is not None:
+                            delay = min(delay, self.max_delay)
+                            self.limiter.back_off(url, delay)
+                        else:
+                            delay = self._backoff(attempt)
+                        log.info("HTTP %d on %s, retry %d in %.1fs", status, url, attempt + 1, delay)
+                        if stream:
+                            r.close()
+                    else:
+                        breaker.record_success()
+                        settled = True
+                        return r
+            finally:
+                if not settled:
+                    breaker.release_probe()
+            workers.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self.inner.close()
@@ -0,0 +1,1131 @@
+"""Headless reading core: search and pagination, chapters, covers, page loading,
+prefetch and progress, with no Tk dependency.
+
+Results arrive through callbacks. Both classes take a ``dispatch`` function
+that decides which thread runs them: the Tk app passes
+``lambda fn: self.after(0, fn)``, while a benchmark or CLI can keep the
+default and have callbacks run directly on the worker thread.
+
+Requests that replace each other (a new search, another manga's chapter
+list, a page the reader skipped past) abort the superseded job, including
+a download in progress, and its late result is never delivered.
+"""
+
+import bisect
+import io
+import json
+import os
+import posixpath
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+from disk_cache import DiskCache
+from downloads import DownloadManager
+from image_cache import ImageCache
+from imaging import ProgressiveDecoder, cover_renditions, decode, decode_to_fit, encode_webp, fit_size
+from local_archive import LocalArchiveAPI
+from manga_api import ChapterInfo, MangaResult
+from metadata_index import MetadataIndex
+from progress_store import ProgressStore
+from telemetry import telemetry
+from workers import (
+    WorkerPool, Job, Cancelled, host_of,
+    PRIORITY_PAGE, PRIORITY_PREFETCH, PRIORITY_COVER_VISIBLE,
+)
+
+PAGE_SIZE = 24
+DEFAULT_BOX = (1020, 730)  # page fit box for the reader's default 1100x850 window
+COVER_GROUP = "covers"
+# Grid cover renditions: 1x for standard displays, 2x for HiDPI scaling
+COVER_SCALES = (1, 2)
+ALL_SOURCES = "all"  # federated browse/search over every API at once
+# Finished searches kept for reuse and for narrowing longer queries
+SEARCH_CACHE_ENTRIES = 32
+SEARCH_CACHE_TTL = 600.0
+# Long-strip layout: page height/width assumed before any page is known, and
+# the tallest rendition made (Tk photo images stop working much past 32k)
+STRIP_DEFAULT_ASPECT = 1.42
+STRIP_MAX_HEIGHT = 32000
+
+
+def _direct(fn) -> None:
+    fn()
+
+
+def _snapshot_key(source: str, include_adult: bool) -> str:
+    return source if include_adult else f"{source}:safe"
+
+
+def _title_key(title: str) -> str:
+    """Titles compared across sources: case, spacing and punctuation ignored."""
+    return re.sub(r"\W+", " ", title.casefold()).strip()
+
+
+def _cover_key(manga: MangaResult, scale: int) -> str:
+    return f"cover:{manga.id}@{scale}x"
+
+
+def _thumb_name(manga: MangaResult) -> str:
+    """Thumbnail cache key: a new cover file gets new thumbnails."""
+    filename = posixpath.basename(urlsplit(manga.cover_url).path)
+    return f"{manga.source}/{manga.id}/{filename}"
+
+
+class LibraryService:
+    """Sources, result paging, chapter lists, covers and opening chapters.
+
+    Result state (``results``, ``total``, ...) is only changed inside
+    dispatched callbacks, so a UI that dispatches onto its own thread can
+    read it without locking.
+    """
+
+    def __init__(
+        self,
+        apis: dict[str, object],
+        pool: WorkerPool,
+        progress: ProgressStore,
+        image_cache: ImageCache,
+        cover_cache: ImageCache,
+        rendition_cache: ImageCache,
+        downloads: DownloadManager | None = None,
+        cover_box: tuple[int, int] = (175, 240),
+        thumb_cache: DiskCache | None = None,
+        dispatch=_direct,
+        snapshot_path: str | None = None,
+        index: MetadataIndex | None = None,
+    ):
+        self.apis = apis
+        self.pool = pool
+        self.progress = progress
+        self.image_cache = image_cache
+        self.cover_cache = cover_cache
+        self.rendition_cache = rendition_cache
+        self.downloads = downloads
+        # Grid covers at 1x and 2x of ``cover_box``, kept on disk as WebP
+        self.cover_box = cover_box
+        self.thumb_cache = thumb_cache
+        self.dispatch = dispatch
+        # Last first page of popular titles per source, painted before the network answers
+        self.snapshot_path = snapshot_path
+        self._snapshot_lock = threading.Lock()
+        # Every result seen, for offline search and typeahead
+        self.index = index
+        self.local_archive: LocalArchiveAPI | None = None
+        # Reader sessions (and chapter opens in flight) using each archive
+        self._archive_users: dict[LocalArchiveAPI, int] = {}
+        self._archive_lock = threading.Lock()
+
+        self.results: list[MangaResult] = []
+        self.total = 0
+        self.mode = "browse"
+        self.query = ""
+        self.source = "mangadex"
+        self.include_adult = True
+        # Sources still answering, failures, and paging per source
+        self.pending_sources: set[str] = set()
+        self.failed_sources: dict[str, Exception] = {}
+        self._offsets: dict[str, int] = {}
+        self._totals: dict[str, int] = {}
+        self._seen: set = set()
+        # Per kind of request ("query", "more", "chapters", "open"): the
+        # generation still wanted and the job serving it
+        self._generations: dict[str, int] = {}
+        self._jobs: dict[str, list[Job]] = {}
+        # (source, include_adult, normalized query) -> (stored_at, results, offsets, totals)
+        self._search_cache: OrderedDict[tuple, tuple] = OrderedDict()
+
+    # --- Sources ---------------------------------------------------------------
+
+    def api_for(self, source: str):
+        if source == LocalArchiveAPI.SOURCE:
+            return self.local_archive
+        return self.apis[source]
+
+    def retain_api(self, api) -> None:
+        """Count a user of ``api``; only local archives need it."""
+        if isinstance(api, LocalArchiveAPI):
+            with self._archive_lock:
+                self._archive_users[api] = self._archive_users.get(api, 0) + 1
+
+    def release_api(self, api) -> None:
+        """Drop a user of ``api``. An archive is closed once nothing uses it
+        and it is not the current local source, which frees its file handle."""
+        if not isinstance(api, LocalArchiveAPI):
+            return
+        with self._archive_lock:
+            users = self._archive_users.get(api, 0) - 1
+            if users > 0:
+                self._archive_users[api] = users
+                return
+            self._archive_users.pop(api, None)
+            if api is self.local_archive:
+                return
+        api.close()
+
+    def open_archive(self, path: str) -> MangaResult:
+        """Make a local CBZ/zip the current local source. Raises OSError/ArchiveError."""
+        api = LocalArchiveAPI(path)
+        # The previous archive stays open while a reader still uses it
+        previous, self.local_archive = self.local_archive, api
+        if previous is not None:
+            self.retain_api(previous)
+            self.release_api(previous)
+        return MangaResult(
+            id=os.path.abspath(path),
+            title=api.title,
+            description="",
+            cover_url="",
+            status="",
+            year=None,
+            tags=[],
+            source=LocalArchiveAPI.SOURCE,
+        )
+
+    def _submit(
+        self, fn, on_done, on_error, priority: int = PRIORITY_PAGE, slot: str | None = None, join: bool = False,
+        on_drop=None,
+    ) -> Job:
+        """Run ``fn`` on the pool; hand its result or exception to the callbacks.
+
+        With ``slot``, this replaces the previous request of that kind: it is
+        aborted, and whatever it still produces is dropped. ``join`` runs it
+        alongside the slot's current request instead (one per source).
+        ``on_drop(result)`` gets a result that was dropped as stale.
+        """
+        if slot is None:
+            gen = None
+        elif join:
+            gen = self._generations.get(slot, 0)
+        else:
+            gen = self.cancel(slot)
+
+        def current() -> bool:
+            return slot is None or self._generations[slot] == gen
+
+        def run():
+            try:
+                result = fn()
+            except Cancelled:
+                return
+            except Exception as e:
+                if on_error is not None and current():
+                    self.dispatch(lambda e=e: on_error(e) if current() else None)
+                return
+            if current():
+                self.dispatch(lambda: on_done(result) if current() else drop(result))
+            else:
+                drop(result)
+
+        def drop(result):
+            if on_drop is not None:
+                on_drop(result)
+
+        job = self.pool.submit(run, priority=priority)
+        if slot is not None:
+            self._jobs.setdefault(slot, []).append(job)
+        return job
+
+    def cancel(self, *slots: str) -> int:
+        """Abort pending requests of these kinds; returns the new generation."""
+        gen = 0
+        for slot in slots:
+            gen = self._generations[slot] = self._generations.get(slot, 0) + 1
+            for job in self._jobs.pop(slot, ()):
+                job.abort()
+        return gen
+
+    # --- Results and paging ----------------------------------------------------
+
+    @property
+    def has_more(self) -> bool:
+        return any(self._offsets[s] < self._totals[s] for s in self._offsets)
+
+    def browse(self, source: str, include_adult: bool, on_done, on_error=None) -> Job | list[Job]:
+        """Popular titles, replacing the current results. ``on_done(results, total)``."""
+        return self._query(source, "browse", "", include_adult, on_done, on_error)
+
+    def search(
+        self, source: str, query: str, include_adult: bool, on_done, on_error=None, reuse: bool = False
+    ) -> Job | list[Job] | None:
+        """Title search, replacing the current results. ``on_done(results, total)``.
+
+        Matches already in the local index are delivered at once and the
+        remote results are appended as they arrive. With ``ALL_SOURCES``
+        every source is asked at once, ``on_done`` runs as each one answers
+        with the merged results so far, and the jobs are returned as a list.
+
+        With ``reuse``, a recent identical search answers without any
+        request (returns None). A finished one this query only adds words to
+        is narrowed by title and shown first, like the local matches; the
+        sources still get the query, since they also match alt titles and tags.
+        """
+        narrowed = []
+        if reuse:
+            hit = self._cached_search(source, query, include_adult)
+            if hit is not None:
+                self._show_cached(source, query, include_adult, *hit, on_done)
+                return None
+            narrowed = self._narrowed_search(source, query, include_adult)
+        return self._query(source, "search", query, include_adult, on_done, on_error, narrowed)
+
+    def _query(self, source, mode, query, include_adult, on_done, on_error, seed=()) -> Job | list[Job]:
+        sources = list(self.apis) if source == ALL_SOURCES else [source]
+        # Paging through the old results is moot too
+        self.cancel("more")
+        local = [*seed, *self.search_local(query, source)] if mode == "search" else []
+        pending = set(sources)
+        started = [False]
+
+        def fetch(s):
+            page = self._fetch(s, mode, query, 0, include_adult)
+            if mode == "browse" and source != ALL_SOURCES:
+                self._save_snapshot(s, include_adult, *page)
+            return page
+
+        def start():
+            # Local matches, or else the first source to answer, replace the previous results
+            if not started[0]:
+                started[0] = True
+                self.mode, self.query, self.source, self.include_adult = mode, query, source, include_adult
+                self.pending_sources, self.failed_sources = set(pending), {}
+                self.results, self._seen = [], set()
+                self._offsets, self._totals = {}, {}
+                self._merge(local)
+                self.total = len(self.results)
+
+        def arrived(s, page):
+            results, total = page
+            start()
+            pending.discard(s)
+            self.pending_sources = set(pending)
+            self._offsets[s] = len(results)
+            self._totals[s] = total or len(results)
+            self._merge(results)
+            self.total = max(len(self.results), sum(self._totals.values()))
+            self._remember_search()
+            on_done(self.results, self.total)
+
+        def failed(s, e):
+            pending.discard(s)
+            if not started[0] and not pending:
+                if on_error is not None:
+                    on_error(e)  # every source failed
+                return
+            start()
+            self.pending_sources = set(pending)
+            self.failed_sources[s] = e
+            on_done(self.results, self.total)
+
+        jobs = [
+            self._submit(
+                lambda s=s: fetch(s),
+                lambda page, s=s: arrived(s, page),
+                lambda e, s=s: failed(s, e),
+                slot="query", join=i > 0,
+            )
+            for i, s in enumerate(sources)
+        ]
+        if local:
+            gen = self._generations["query"]
+            self.dispatch(lambda: (start(), on_done(self.results, self.total))
+                          if self._generations["query"] == gen and not started[0] else None)
+        return jobs if source == ALL_SOURCES else jobs[0]
+
+    def _fetch(self, source: str, mode: str, query: str, offset: int, include_adult: bool):
+        """One page of browse/search results (worker thread), added to the local index."""
+        api = self.api_for(source)
+        if mode == "browse":
+            page = api.browse_manga(limit=PAGE_SIZE, offset=offset, include_adult=include_adult)
+        else:
+            page = api.search_manga(query, limit=PAGE_SIZE, offset=offset, include_adult=include_adult)
+        if self.index is not None:
+            self.index.add(page[0])
+        return page
+
+    def _merge(self, results: list[MangaResult]) -> list[MangaResult]:
+        """Append results not shown yet; returns those added. Across sources
+        the same title counts as shown; within one, only the same id does."""
+        added = []
+        for m in results:
+            key = _title_key(m.title) if self.source == ALL_SOURCES else (m.source, m.id)
+            if key not in self._seen:
+                self._seen.add(key)
+                added.append(m)
+        self.results.extend(added)
+        return added
+
+    # --- Search cache ----------------------------------------------------------
+
+    def _remember_search(self) -> None:
+        """Keep the current search once every source has answered without error."""
+        if self.mode != "search" or self.pending_sources or self.failed_sources:
+            return
+        key = (self.source, self.include_adult, _title_key(self.query))
+        self._search_cache[key] = (time.monotonic(), list(self.results), dict(self._offsets), dict(self._totals))
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > SEARCH_CACHE_ENTRIES:
+            self._search_cache.popitem(last=False)
+
+    def _cached_search(self, source: str, query: str, include_adult: bool):
+        """(results, offsets, totals) of a recent identical search, paging state included, or None."""
+        q = _title_key(query)
+        entry = self._search_cache.get((source, include_adult, q))
+        if not q or entry is None or time.monotonic() - entry[0] >= SEARCH_CACHE_TTL:
+            return None
+        self._search_cache.move_to_end((source, include_adult, q))
+        telemetry.count("search_cache.hit")
+        return entry[1], entry[2], entry[3]
+
+    def _narrowed_search(self, source: str, query: str, include_adult: bool) -> list[MangaResult]:
+        """Titles matching ``query`` from the complete result set (nothing left
+        to page) of a shorter search, provided the query only appends whole
+        words: the sources match words, so "naruto" is not a subset of what
+        "narut" found. Only a first paint: the sources match more than titles.
+        """
+        now = time.monotonic()
+        q = _title_key(query)
+        best = None
+        for (src, adult, p), (stored, results, offsets, totals) in self._search_cache.items():
+            if (src, adult) != (source, include_adult) or not q.startswith(p + " ") or now - stored >= SEARCH_CACHE_TTL:
+                continue
+            if any(offsets[s] < totals[s] for s in offsets):
+                continue  # incomplete: the rest could hold matches
+            if best is None or len(p) > len(best[0]):
+                best = (p, results)
+        if best is None:
+            telemetry.count("search_cache.miss")
+            return []
+        telemetry.count("search_cache.narrowed")
+        words = q.split()
+        return [m for m in best[1] if all(w in _title_key(m.title) for w in words)]
+
+    def _show_cached(self, source, query, include_adult, results, offsets, totals, on_done) -> None:
+        self.cancel("query", "more")  # an in-flight search for an older prefix is moot
+        gen = self._generations["query"]
+
+        def show():
+            if self._generations["query"] != gen:
+                return
+            self.mode, self.query, self.source, self.include_adult = "search", query, source, include_adult
+            self.pending_sources, self.failed_sources = set(), {}
+            self.results, self._seen = [], set()
+            self._merge(results)
+            self._offsets, self._totals = dict(offsets), dict(totals)
+            self.total = max(len(self.results), sum(self._totals.values()))
+            on_done(self.results, self.total)
+
+        self.dispatch(show)
+
+    def search_local(self, query: str, source: str | None = None, limit: int = PAGE_SIZE) -> list[MangaResult]:
+        """Ranked matches from titles seen before, without any network."""
+        if self.index is None:
+            return []
+        return self.index.search(query, None if source == ALL_SOURCES else source, limit)
+
+    def suggest(self, prefix: str, source: str | None = None, limit: int = 8) -> list[str]:
+        """Typeahead titles from the local index."""
+        if self.index is None:
+            return []
+        return self.index.suggest(prefix, None if source == ALL_SOURCES else source, limit)
+
+    def load_snapshot(self, source: str, include_adult: bool) -> bool:
+        """Make the saved browse results for ``source`` the current results, if any."""
+        if not self.snapshot_path:
+            return False
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                entry = json.load(f).get(_snapshot_key(source, include_adult))
+            results = [MangaResult(**item) for item in entry["results"]] if entry else []
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+        if not results:
+            return False
+        self.mode, self.query, self.source, self.include_adult = "browse", "", source, include_adult
+        self.pending_sources, self.failed_sources = set(), {}
+        self.results, self._seen = [], set()
+        self._merge(results)
+        self._offsets = {source: len(results)}
+        self._totals = {source: entry.get("total", len(results))}
+        self.total = self._totals[source]
+        return True
+
+    def _save_snapshot(self, source: str, include_adult: bool, results: list[MangaResult], total: int) -> None:
+        if not self.snapshot_path:
+            return
+        with self._snapshot_lock:
+            try:
+                with open(self.snapshot_path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            data[_snapshot_key(source, include_adult)] = {
+                "saved_at": time.time(),
+                "total": total,
+                "results": [asdict(m) for m in results],
+            }
+            try:
+                directory = os.path.dirname(self.snapshot_path) or "."
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.snapshot_path)
+            except OSError:
+                pass  # only costs the instant first paint next time
+
+    def load_more(self, on_done, on_error=None) -> Job | list[Job] | None:
+        """Next page of the current results. ``on_done(new_results, total)``; None if exhausted.
+
+        Each source is paged by its own offset; a list of jobs with ``ALL_SOURCES``.
+        """
+        if not self.has_more:
+            return None
+        mode, query, include_adult = self.mode, self.query, self.include_adult
+        sources = [s for s in self._offsets if self._offsets[s] < self._totals[s]]
+        pending = set(sources)
+        answered = [False]
+
+        def arrived(s, offset, page):
+            results, total = page
+            answered[0] = True
+            pending.discard(s)
+            self.pending_sources = set(pending)
+            if self._offsets.get(s) != offset:
+                return  # the result list was replaced meanwhile
+            self._offsets[s] = offset + len(results)
+            self._totals[s] = total if results else self._offsets[s]  # no results: ran dry early
+            added = self._merge(results)
+            self.total = max(len(self.results), sum(self._totals.values()))
+            self._remember_search()
+            on_done(added, self.total)
+
+        def failed(s, e):
+            pending.discard(s)
+            self.pending_sources = set(pending)
+            if not pending and not answered[0]:
+                if on_error is not None:
+                    on_error(e)
+                return
+            self.failed_sources[s] = e
+            on_done([], self.total)
+
+        jobs = [
+            self._submit(
+                lambda s=s, o=self._offsets[s]: self._fetch(s, mode, query, o, include_adult),
+                lambda page, s=s, o=self._offsets[s]: arrived(s, o, page),
+                lambda e, s=s: failed(s, e),
+                slot="more", join=i > 0,
+            )
+            for i, s in enumerate(sources)
+        ]
+        return jobs if self.source == ALL_SOURCES else jobs[0]
+
+    # --- Chapters and progress -------------------------------------------------
+
+    def load_chapters(self, manga: MangaResult, on_done, on_error=None) -> Job:
+        api = self.api_for(manga.source)
+        return self._submit(lambda: api.get_manga_chapters(manga.id), on_done, on_error, slot="chapters")
+
+    def saved_progress(self, manga: MangaResult) -> tuple[str | None, int]:
+        return self.progress.get(manga.id, manga.source)
+
+    def resume_page(self, manga: MangaResult, chapter: ChapterInfo) -> int:
+        saved_ch_id, saved_page = self.saved_progress(manga)
+        return saved_page if saved_ch_id == chapter.id else 0
+
+    def open_chapter(
+        self,
+        manga: MangaResult,
+        chapter: ChapterInfo,
+        on_done,
+        on_error=None,
+        initial_page: int | None = None,
+    ) -> Job:
+        """Resolve the chapter's pages; ``on_done(api, urls, initial_page)``.
+
+        Downloaded chapters are read from their local archive.
+        """
+        if initial_page is None:
+            initial_page = self.resume_page(manga, chapter)
+
+        def resolve():
+            api = self.api_for(manga.source)
+            if self.downloads is not None and manga.source != LocalArchiveAPI.SOURCE:
+                path = self.downloads.archive_path(manga.source, manga.id, chapter.id)
+                if os.path.exists(path):
+                    api = LocalArchiveAPI(path)
+            # Held until on_done has run; a session it opens keeps its own hold
+            self.retain_api(api)
+            try:
+                return api, api.get_chapter_images(chapter.id)
+            except BaseException:
+                self.release_api(api)
+                raise
+
+        def done(result):
+            try:
+                on_done(result[0], result[1], initial_page)
+            finally:
+                self.release_api(result[0])
+
+        return self._submit(resolve, done, on_error, slot="open", on_drop=lambda r: self.release_api(r[0]))
+
+    def session(self, manga: MangaResult, chapter: ChapterInfo, api, urls: list[str], **kwargs) -> "ReaderSession":
+        return ReaderSession(self, api, urls, chapter, manga_id=manga.id, source=manga.source, **kwargs)
+
+    def strip_session(self, manga: MangaResult, chapter: ChapterInfo, api, urls: list[str], **kwargs) -> "StripSession":
+        return StripSession(self, api, urls, chapter, manga_id=manga.id, source=manga.source, **kwargs)
+
+    # --- Covers ------------------------------------------------------------------
+
+    def cached_cover(self, manga: MangaResult, scale: int = 1) -> Image.Image | None:
+        return self.rendition_cache.get(_cover_key(manga, scale))
+
+    def fetch_cover(self, manga: MangaResult, scale: int = 1) -> Image.Image:
+        """Cover at ``scale`` times ``cover_box`` (worker thread).
+
+        The first time a cover is seen it is decoded once and every scale is
+        written to the thumbnail cache; after that the rendition for the
+        display is read back as is, without resampling.
+        """
+        key = _cover_key(manga, scale)
+        img = self.rendition_cache.get(key)
+        if img is not None:
+            return img
+        thumb_key = (f"cover@{scale}x", _thumb_name(manga))
+        data = self.thumb_cache.get(*thumb_key) if self.thumb_cache is not None else None
+        if data is not None:
+            with telemetry.span("cover.thumb"):
+                img = decode(data)
+        else:
+            with telemetry.span("cover.load"):
+                data = self.cover_cache.get(manga.id)
+                if data is None:
+                    data = self.api_for(manga.source).fetch_image(manga.cover_url)
+                    self.cover_cache.put(manga.id, data)
+                renditions = cover_renditions(data, self.cover_box, COVER_SCALES)
+            if self.thumb_cache is not None:
+                with telemetry.span("cover.encode"):
+                    for s, rendition in renditions.items():
+                        self.thumb_cache.put(f"cover@{s}x", _thumb_name(manga), encode_webp(rendition))
+            img = renditions[scale]
+        self.rendition_cache.put(key, img)
+        return img
+
+    def load_cover(self, manga: MangaResult, priority: int = PRIORITY_COVER_VISIBLE, scale: int = 1) -> Job:
+        """Queue a cover; the returned job can be reprioritized or cancelled."""
+        return self.pool.submit(
+            self.fetch_cover, manga, scale,
+            priority=priority, host=host_of(manga.cover_url), group=COVER_GROUP,
+        )
+
+    def cancel_covers(self) -> None:
+        self.pool.cancel_group(COVER_GROUP, running=True)
+
+
+class ReaderSession:
+    """One open chapter: the current page, the read-ahead window and progress.
+
+    ``on_page(idx, image)`` receives the page scaled to fit ``box``;
+    ``on_loading(idx)`` fires when a page has to be fetched first and
+    ``on_error(idx, exc)`` when that fails. ``on_preview(idx, image)``, if
+    given, receives coarse renditions while the current page is still
+    downloading. Only results for the current page are delivered.
+    """
+
+    def __init__(
+        self,
+        library: LibraryService,
+        api,
+        urls: list[str],
+        chapter: ChapterInfo,
+        manga_id: str = "",
+        source: str = "mangadex",
+        initial_page: int = 0,
+        box: tuple[int, int] = DEFAULT_BOX,
+        prefetch_ahead: int = 3,
+        prefetch_behind: int = 1,
+        on_page=None,
+        on_loading=None,
+        on_error=None,
+        on_preview=None,
+        dispatch=None,
+    ):
+        self.library = library
+        self.api = api
+        self.urls = urls
+        self.chapter_id = chapter.id
+        self.manga_id = manga_id
+        self.source = source
+        self.page_index = max(0, min(initial_page, len(urls) - 1)) if urls else 0
+        self.box = box
+        self.prefetch_ahead = max(0, prefetch_ahead)
+        self.prefetch_behind = max(0, prefetch_behind)
+        self.on_page = on_page
+        self.on_loading = on_loading
+        self.on_error = on_error
+        self.on_preview = on_preview
+        self.dispatch = dispatch or library.dispatch
+        self._group = f"reader:{id(self)}"
+        self._prefetch_jobs: dict[int, Job] = {}
+        self._fast_job: Job | None = None
+        self._pinned_key: str | None = None
+        self._closed = False
+        library.retain_api(api)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.urls)
+
+    # --- Navigation --------------------------------------------------------------
+
+    def start(self) -> None:
+        self._load_page()
+
+    def goto(self, idx: int) -> bool:
+        if not 0 <= idx < len(self.urls) or idx == self.page_index:
+            return False
+        self.page_index = idx
+        self.save_progress()
+        self._load_page()
+        return True
+
+    def next(self) -> bool:
+        return self.goto(self.page_index + 1)
+
+    def prev(self) -> bool:
+        return self.goto(self.page_index - 1)
+
+    def is_ready(self, idx: int) -> bool:
+        """Whether ``idx`` can be shown without waiting; queues the window if not."""
+        if self._rendition_key(idx, self.box) in self.library.rendition_cache:
+            return True
+        self._prefetch()
+        return False
+
+    def save_progress(self) -> None:
+        if self.manga_id:
+            self.library.progress.set(self.manga_id, self.source, self.chapter_id, self.page_index)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.save_progress()
+        self.library.progress.flush()
+        self._closed = True
+        self.library.pool.cancel_group(self._group, running=True)
+        self._prefetch_jobs.clear()
+        self._pin_page(None)
+        self.library.release_api(self.api)
+
+    # --- Page loading ------------------------------------------------------------
+
+    def _page_key(self, idx: int) -> str:
+        return f"{self.chapter_id}_{idx}"
+
+    def _rendition_key(self, idx: int, box: tuple[int, int]) -> str:
+        return f"{self._page_key(idx)}@{box[0]}x{box[1]}"
+
+    def _pin_page(self, cache_key: str | None) -> None:
+        """Keep the shown page out of LRU eviction; release the previous one."""
+        cache = self.library.image_cache
+        if self._pinned_key == cache_key:
+            return
+        if self._pinned_key is not None:
+            cache.unpin(self._pinned_key)
+        self._pinned_key = cache_key
+        if cache_key is not None:
+            cache.pin(cache_key)
+
+    def _page_bytes(self, idx: int, on_chunk=None) -> bytes:
+        """Compressed page, from the page cache or the source (worker thread)."""
+        cache = self.library.image_cache
+        cache_key = self._page_key(idx)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.api.fetch_image(self.urls[idx], on_chunk=on_chunk)
+            cache.put(cache_key, data)
+        return data
+
+    def _previewer(self, idx: int, box: tuple[int, int]):
+        """Chunk callback showing partial renditions, while ``idx`` is the current page."""
+        if self.on_preview is None:
+            return None
+        decoder = ProgressiveDecoder(box)
+
+        def on_chunk(chunk: bytes) -> None:
+            decoder.feed(chunk)
+            # Prefetched pages only pay for previews once the reader is on them
+            if not self._closed and idx == self.page_index and box == self.box:
+                img = decoder.preview()
+                if img is not None:
+                    self._deliver(idx, img, box, preview=True)
+
+        return on_chunk
+
+    def fetch_page(self, idx: int, box: tuple[int, int] | None = None) -> Image.Image:
+        """Page decoded straight at the size that fits ``box``, cached (worker thread)."""
+        box = box or self.box
+        key = self._rendition_key(idx, box)
+        renditions = self.library.rendition_cache
+        scaled = renditions.get(key)
+        if scaled is None:
+            scaled = decode_to_fit(self._page_bytes(idx, self._previewer(idx, box)), box)
+            renditions.put(key, scaled)
+        return scaled
+
+    def _deliver(self, idx: int, img: Image.Image, box: tuple[int, int] | None = None, preview: bool = False) -> None:
+        ready_at = time.perf_counter()
+
+        def run():
+            if not preview:
+                # Time the finished page sat waiting for the dispatch thread
+                telemetry.record("ui.wait", time.perf_counter() - ready_at)
+            if not self._closed and idx == self.page_index and (box is None or box == self.box):
+                callback = self.on_preview if preview else self.on_page
+                if callback is not None:
+                    callback(idx, img)
+
+        self.dispatch(run)
+
+    def _load_page(self) -> None:
+        idx = self.page_index
+        if idx < 0 or idx >= len(self.urls):
+            return
+        self._pin_page(self._page_key(idx))
+        scaled = self.library.rendition_cache.get(self._rendition_key(idx, self.box))
+        if scaled is not None:
+            if self.on_page is not None:
+                self.on_page(idx, scaled)
+            self._prefetch()
+            return
+        if self.on_loading is not None:
+            self.on_loading(idx)
+        pool = self.library.pool
+        job = self._prefetch_jobs.get(idx)
+        if (
+            job is None or job.aborted or job.args[1] != self.box
+            or (job.done() and job.exception() is not None)
+        ):
+            job = pool.submit(
+                self.fetch_page, idx, self.box,
+                priority=PRIORITY_PAGE, host=host_of(self.urls[idx]), group=self._group,
+            )
+        else:
+            # Already queued or downloading as a prefetch; move it to the front
+            pool.reprioritize(job, PRIORITY_PAGE)
+        # Tracked with the read-ahead, so it is aborted once skipped past
+        self._prefetch_jobs[idx] = job
+        job.add_done_callback(lambda f: self._on_page_loaded(idx, f))
+        self._prefetch()
+
+    def _on_page_loaded(self, idx: int, job: Job) -> None:
+        """Done-callback for the current page; runs on the worker thread."""
+        if job.cancelled():
+            return
+        err = job.exception()
+        if isinstance(err, Cancelled):
+            return
+        if err is not None:
+            if self.on_error is not None:
+                self.dispatch(lambda: self.on_error(idx, err)
+                              if not self._closed and idx == self.page_index else None)
+            return
+        if job.args[1] != self.box:
+            # Rendered for a box from before a resize; rescale it for the current one
+            self.dispatch(lambda: self.refine() if not self._closed and idx == self.page_index else None)
+            return
+        self._deliver(idx, job.result(), job.args[1])
+
+    def _prefetch(self) -> None:
+        """Queue the read-ahead window and drop queued pages that fell out of it."""
+        if self._closed:
+            return
+        lo = max(0, self.page_index - self.prefetch_behind)
+        hi = min(len(self.urls) - 1, self.page_index + self.prefetch_ahead)
+        for idx in list(self._prefetch_jobs):
+            job = self._prefetch_jobs[idx]
+            stale = job.args[1] != self.box
+            if job.done() or not lo <= idx <= hi or stale:
+                # Out of the window: stop downloading it, even mid-transfer.
+                # One rendering for an earlier box is requeued, but a running
+                # download still fills the page cache, so it is left to finish
+                if not (stale and lo <= idx <= hi and job.running()):
+                    job.abort()
+                del self._prefetch_jobs[idx]
+        # Nearest pages first, forward before backward
+        order = sorted(range(lo, hi + 1), key=lambda i: (abs(i - self.page_index), i < self.page_index))
+        renditions = self.library.rendition_cache
+        for idx in order:
+            if idx == self.page_index or idx in self._prefetch_jobs:
+                continue
+            if self._rendition_key(idx, self.box) in renditions:
+                continue
+            self._prefetch_jobs[idx] = self.library.pool.submit(
+                self.fetch_page, idx, self.box,
+                priority=PRIORITY_PREFETCH, host=host_of(self.urls[idx]), group=self._group,
+            )
+
+    # --- Resizing ----------------------------------------------------------------
+
+    def set_box(self, box: tuple[int, int]) -> bool:
+        """New fit box. Shows a cheap resample right away; call ``refine`` once
+        resizing settles for the high-quality one. False if unchanged."""
+        if box == self.box:
+            return False
+        self.box = box
+        if self._fast_job is None or self._fast_job.done():
+            self._fast_job = self._rescale(fast=True)
+        return True
+
+    def refine(self) -> None:
+        scaled = self.library.rendition_cache.get(self._rendition_key(self.page_index, self.box))
+        if scaled is not None:
+            if self.on_page is not None:
+                self.on_page(self.page_index, scaled)
+        else:
+            self._rescale(fast=False)
+
+    def _rescale(self, fast: bool) -> Job | None:
+        """Rescale the shown page for the current box on a worker."""
+        idx = self.page_index
+        data = self.library.image_cache.get(self._page_key(idx))
+        if data is None:
+            return None
+        box = self.box
+
+        def work():
+            if fast:
+                return decode_to_fit(data, box, fast=True)
+            return self.fetch_page(idx, box)
+
+        job = self.library.pool.submit(work, priority=PRIORITY_PAGE, group=self._group)
+        job.add_done_callback(
+            lambda f: None if f.cancelled() or f.exception() is not None else self._deliver(idx, f.result(), box)
+        )
+        return job
+
+
+class StripSession(ReaderSession):
+    """One chapter as a continuous vertical strip, pages ``width`` pixels wide.
+
+    Every page has a slot in the layout from the start: its real height once
+    the image header has been read, until then the median of the pages seen
+    so far. ``set_viewport`` loads pages within ``ahead``/``behind`` screens
+    of the visible area and releases shown pages more than ``keep`` screens
+    away, so memory stays bounded on chapters of any length.
+
+    ``on_page(idx, image)`` shows a page at ``offsets[idx]``;
+    ``on_release(idx)`` takes it down again. ``on_layout(top)`` fires when
+    slot heights change, with the scroll position that keeps the content
+    at the top of the viewport in place. ``page_index`` follows the page at
+    the top of the viewport.
+    """
+
+    def __init__(
+        self,
+        library: LibraryService,
+        api,
+        urls: list[str],
+        chapter: ChapterInfo,
+        width: int = DEFAULT_BOX[0],
+        ahead: float = 2.0,
+        behind: float = 1.0,
+        keep: float = 3.0,
+        on_release=None,
+        on_layout=None,
+        **kwargs,
+    ):
+        kwargs.pop("box", None)
+        super().__init__(library, api, urls, chapter, box=(width, STRIP_MAX_HEIGHT), **kwargs)
+        self.ahead = ahead
+        self.behind = behind
+        self.keep = max(keep, ahead, behind)
+        self.on_release = on_release
+        self.on_layout = on_layout
+        # Source image sizes, learned as pages are fetched
+        self.sizes: list[tuple[int, int] | None] = [None] * len(urls)
+        self.offsets: list[int] = [0]
+        self.shown: set[int] = set()
+        self._top = 0
+        self._height = 0
+        self._relayout()
+
+    @property
+    def width(self) -> int:
+        return self.box[0]
+
+    @property
+    def total_height(self) -> int:
+        return self.offsets[-1]
+
+    def page_at(self, y: float) -> int:
+        """Index of the page whose slot contains ``y``."""
+        return max(0, min(len(self.urls) - 1, bisect.bisect_right(self.offsets, y) - 1))
+
+    # --- Layout ------------------------------------------------------------------
+
+    def _relayout(self) -> None:
+        heights = [fit_size(size, self.box)[1] if size else 0 for size in self.sizes]
+        known = sorted(h for h in heights if h)
+        estimate = known[len(known) // 2] if known else round(self.width * STRIP_DEFAULT_ASPECT)
+        offsets = [0]
+        for h in heights:
+            offsets.append(offsets[-1] + (h or estimate))
+        self.offsets = offsets
+
+    def _relayout_anchored(self, scale: float = 1.0) -> None:
+        """Relayout, keeping the viewport on the same spot of the same page."""
+        anchor = self.page_at(self._top)
+        into = (self._top - self.offsets[anchor]) * scale
+        self._relayout()
+        self._top = round(self.offsets[anchor] + into)
+        if self.on_layout is not None:
+            self.on_layout(self._top)
+
+    def set_width(self, width: int) -> bool:
+        """Lay the strip out for a new width. Shown pages are taken down and
+        reloaded at the new size. False if unchanged."""
+        if width == self.width or width <= 0:
+            return False
+        old = self.width
+        self.box = (width, STRIP_MAX_HEIGHT)
+        for job in self._prefetch_jobs.values():
+            job.abort()
+        self._prefetch_jobs.clear()
+        for idx in sorted(self.shown):
+            self._release(idx)
+        self._relayout_anchored(width / old)
+        self._update_window()
+        return True
+
+    # --- Navigation --------------------------------------------------------------
+
+    def start(self) -> None:
+        self._top = self.offsets[self.page_index]
+
+    def goto(self, idx: int) -> bool:
+        """Move the viewport top to page ``idx``; the UI scrolls to ``offsets[idx]``."""
+        if not 0 <= idx < len(self.urls):
+            return False
+        self.set_viewport(self.offsets[idx], self._height)
+        return True
+
+    def set_viewport(self, top: int, height: int) -> None:
+        self._top, self._height = top, height
+        idx = self.page_at(top)
+        if height and top + height >= self.total_height:
+            idx = len(self.urls) - 1  # scrolled to the end
+        if idx != self.page_index:
+            self.page_index = idx
+            self.save_progress()
+        self._update_window()
+
+    def is_ready(self, idx: int) -> bool:
+        return idx in self.shown
+
+    def close(self) -> None:
+        super().close()
+        self.shown.clear()
+
+    # --- Page loading ------------------------------------------------------------
+
+    def _window(self, screens_before: float, screens_after: float) -> range:
+        vh = max(self._height, 1)
+        lo = self.page_at(self._top - screens_before * vh)
+        hi = self.page_at(self._top + vh + screens_after * vh)
+        return range(lo, hi + 1)
+
+    def _release(self, idx: int) -> None:
+        self.shown.discard(idx)
+        telemetry.count("strip.released")
+        if self.on_release is not None:
+            self.on_release(idx)
+
+    def _update_window(self) -> None:
+        """Load what is near the viewport, abort and release what is not."""
+        if self._closed or not self.urls:
+            return
+        kept = self._window(self.keep, self.keep)
+        for idx in sorted(self.shown):
+            if idx not in kept:
+                self._release(idx)
+        wanted = self._window(self.behind, self.ahead)
+        visible = self._window(0, 0)
+        for idx in list(self._prefetch_jobs):
+            job = self._prefetch_jobs[idx]
+            if idx not in wanted:
+                job.abort()
+                del self._prefetch_jobs[idx]
+            elif idx in visible:
+                self.library.pool.reprioritize(job, PRIORITY_PAGE)
+        # Visible pages first, then outward from the viewport
+        order = sorted(wanted, key=lambda i: (i not in visible, abs(i - self.page_index)))
+        renditions = self.library.rendition_cache
+        for idx in order:
+            if idx in self.shown or idx in self._prefetch_jobs:
+                continue
+            size = self.sizes[idx]
+            scaled = renditions.get(self._rendition_key(idx, self.box)) if size else None
+            if scaled is not None:
+                self.shown.add(idx)
+                if self.on_page is not None:
+                    self.on_page(idx, scaled)
+                continue
+            job = self.library.pool.submit(
+                self._fetch_strip_page, idx, self.box,
+                priority=PRIORITY_PAGE if idx in visible else PRIORITY_PREFETCH,
+                host=host_of(self.urls[idx]), group=self._group,
+            )
+            self._prefetch_jobs[idx] = job
+            job.add_done_callback(lambda f, idx=idx, box=self.box: self._on_strip_page(idx, box, f))
+
+    def _fetch_strip_page(self, idx: int, box: tuple[int, int]) -> tuple[tuple[int, int], Image.Image]:
+        """Source size and width-fitted rendition of a page (worker thread)."""
+        size = self.sizes[idx]
+        if size is None:
+            # The header is enough; Image.open does not decode pixels
+            size = Image.open(io.BytesIO(self._page_bytes(idx))).size
+        return size, self.fetch_page(idx, box)
+
+    def _on_strip_page(self, idx: int, box: tuple[int, int], job: Job) -> None:
+        """Done-callback for a strip page; runs on the worker thread."""
+        if job.cancelled():
+            return
+        err = job.exception()
+        if isinstance(err, Cancelled):
+            return
+        if err is not None:
+            self.dispatch(lambda: self._failed(idx, err, job))
+            return
+        size, img = job.result()
+        self.dispatch(lambda: self._show(idx, box, size, img, job))
+
+    def _failed(self, idx: int, err: BaseException, job: Job) -> None:
+        # Forget the job so the next window update fetches the page again
+        if self._prefetch_jobs.get(idx) is job:
+            del self._prefetch_jobs[idx]
+        if not self._closed and self.on_error is not None:
+            self.on_error(idx, err)
+
+    def _show(self, idx: int, box: tuple[int, int], size: tuple[int, int], img: Image.Image, job: Job) -> None:
+        if self._prefetch_jobs.get(idx) is job:
+            del self._prefetch_jobs[idx]
+        if self._closed or box != self.box:
+            return
+        if self.sizes[idx] != size:
+            self.sizes[idx] = size
+            if fit_size(size, box)[1] != self.offsets[idx + 1] - self.offsets[idx]:
+                self._relayout_anchored()
+        if idx not in self._window(self.keep, self.keep) or idx in self.shown:
+            return
+        self.shown.add(idx)
+        if self.on_page is not None:
+            self.on_page(idx, img)
@@ -0,0 +1,193 @@
+"""Persistent TTL cache for API metadata responses with ETag/Last-Modified revalidation."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from telemetry import telemetry
+from workers import PRIORITY_COVER_OFFSCREEN, Cancelled, WorkerPool
+
+log = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Stored 200 response; quacks like the transports' responses."""
+
+    status_code = 200
+
+    def __init__(self, content: bytes, etag: str | None, last_modified: str | None, stored_at: float):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.headers = {}
+        if etag:
+            self.headers["ETag"] = etag
+        if last_modified:
+            self.headers["Last-Modified"] = last_modified
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class ResponseCache:
+    """SQLite-backed response cache shared by MangaDexAPI and NHentaiAPI.
+
+    Within ``ttl`` a stored response is returned without any request. After
+    that it is revalidated with If-None-Match/If-Modified-Since, and a 304
+    just refreshes the timestamp. With ``stale_while_revalidate`` the stale
+    copy is returned at once and revalidated in the background, on ``pool``
+    when one is given. If the network fails, a stored copy is served rather
+    than raising. Past ``max_stale`` a copy is neither served stale nor as a
+    fallback; the request (or its error) goes to the caller.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_age: float = 7 * 24 * 3600,
+        max_stale: float = 24 * 3600,
+        pool: WorkerPool | None = None,
+    ):
+        self.max_stale = max_stale
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " stored_at REAL NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body BLOB NOT NULL"
+            ")"
+        )
+        self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - max_age,))
+
+    @staticmethod
+    def key(url: str, params=None) -> str:
+        if not params:
+            return url
+        items = sorted((k, v) for k, v in params.items())
+        return f"{url}?{urlencode(items, doseq=True)}"
+
+    def get(
+        self,
+        http,
+        url: str,
+        params=None,
+        headers=None,
+        timeout: float | None = None,
+        ttl: float = 60,
+        stale_while_revalidate: bool = False,
+    ):
+        key = self.key(url, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry.stored_at
+            if age < ttl:
+                telemetry.count("response_cache.hit")
+                return entry
+            if stale_while_revalidate and age < self.max_stale:
+                telemetry.count("response_cache.stale")
+                self._refresh_in_background(key, http, url, params, headers, timeout, entry)
+                return entry
+        telemetry.count("response_cache.miss")
+        # An outage or a server error serves a copy that is not too stale
+        fallback = entry if entry is not None and time.time() - entry.stored_at < self.max_stale else None
+        try:
+            r = self._fetch(key, http, url, params, headers, timeout, entry)
+        except Cancelled:
+            raise
+        except Exception:
+            if fallback is not None:
+                return fallback
+            raise
+        if r.status_code >= 500 and fallback is not None:
+            return fallback
+        return r
+
+    def _fetch(self, key, http, url, params, headers, timeout, entry):
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        r = http.get(url, params=params, headers=headers or None, timeout=timeout)
+        if r.status_code == 304 and entry is not None:
+            self._touch(key)
+            return entry
+        if r.status_code == 200:
+            self._store(key, r)
+        return r
+
+    def _refresh_in_background(self, key, http, url, params, headers, timeout, entry) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._fetch(key, http, url, params, headers, timeout, entry)
+            except Exception as e:
+                log.debug("Background revalidation of %s failed: %s", url, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        if self.pool is None:
+            threading.Thread(target=run, daemon=True).start()
+            return
+        # Behind what the user is looking at, ahead of bulk downloads
+        try:
+            self.pool.submit(run, priority=PRIORITY_COVER_OFFSCREEN, host=urlsplit(url).hostname)
+        except RuntimeError:  # pool shut down
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _lookup(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                log.warning("Response cache read failed: %s", e)
+                return None
+        if row is None:
+            return None
+        return CachedResponse(row[0], row[1], row[2], row[3])
+
+    def _store(self, key: str, r) -> None:
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, etag, last_modified, body)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, time.time(), etag, last_modified, r.content),
+                )
+            except sqlite3.Error as e:
+                log.warning("Response cache write failed: %s", e)
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error as e:
+                log.warning("Response cache write failed: %s", e)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
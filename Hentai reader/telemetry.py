@@ -0,0 +1,203 @@
+"""Timing spans and counters for the hot paths, plus an optional JSON-lines log.
+
+    with telemetry.span("page.decode", page=3):
+        ...
+    telemetry.count("http.bytes", len(data))
+
+Spans keep a short window of recent durations per name for the reader's
+debug overlay. When a log is open every span is also written as one JSON
+object per line, so a slow page can be traced to the network, the decode
+or the UI thread after the fact.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+
+class _SpanStats:
+    def __init__(self, window: int):
+        self.recent: deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self.recent.append(seconds)
+        self.count += 1
+
+    def summary(self) -> dict:
+        s = sorted(self.recent)
+        return {
+            "n": self.count,
+            "last_ms": round(self.recent[-1] * 1000, 1),
+            "p50_ms": round(s[len(s) // 2] * 1000, 1),
+            "max_ms": round(s[-1] * 1000, 1),
+        }
+
+
+class Telemetry:
+    """Thread-safe span timings, counters and on-demand gauges."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._spans: dict[str, _SpanStats] = {}
+        self._counters: dict[str, int] = {}
+        self._gauges: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._log: logging.Logger | None = None
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, **fields)
+
+    def record(self, name: str, seconds: float, **fields) -> None:
+        """Add a duration measured elsewhere (e.g. across threads)."""
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = _SpanStats(self.window)
+            stats.add(seconds)
+        if self._log is not None:
+            self._write({
+                "span": name,
+                "ms": round(seconds * 1000, 2),
+                "thread": threading.current_thread().name,
+                **fields,
+            })
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name: str, fn) -> None:
+        """Register ``fn()`` to be sampled whenever a snapshot is taken."""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {name: s.summary() for name, s in self._spans.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        sampled = {}
+        for name, fn in gauges.items():
+            try:
+                sampled[name] = fn()
+            except Exception:
+                sampled[name] = None
+        return {"spans": spans, "counters": counters, "gauges": sampled}
+
+    def log_snapshot(self, **fields) -> None:
+        if self._log is not None:
+            self._write({"snapshot": self.snapshot(), **fields})
+
+    def format_overlay(self) -> str:
+        snap = self.snapshot()
+        lines = [f"{'span':<16}{'last':>8}{'p50':>8}{'max':>8}{'n':>7}"]
+        for name in sorted(snap["spans"]):
+            s = snap["spans"][name]
+            lines.append(f"{name:<16}{s['last_ms']:>8.1f}{s['p50_ms']:>8.1f}{s['max_ms']:>8.1f}{s['n']:>7}")
+        lines.append("")
+        for name in sorted(snap["counters"]):
+            value = snap["counters"][name]
+            if name.endswith(".bytes"):
+                value = f"{value / 2**20:.1f} MB"
+            lines.append(f"{name:<24}{value:>14}")
+        for name in sorted(snap["gauges"]):
+            lines.append(f"{name:<24}{_format_gauge(snap['gauges'][name]):>14}")
+        return "\n".join(lines)
+
+    def open_log(self, path: str, max_bytes: int = 2 * 1024 * 1024, backups: int = 3) -> None:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.getLogger(f"{__name__}.events")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        self._log = log
+
+    def close(self) -> None:
+        log, self._log = self._log, None
+        if log is not None:
+            for handler in list(log.handlers):
+                log.removeHandler(handler)
+                handler.close()
+
+    def _write(self, event: dict) -> None:
+        log = self._log
+        if log is not None:
+            log.info(json.dumps({"t": round(time.time(), 3), **event}, default=str))
+
+
+class PhaseTimer:
+    """Consecutive named phases of a one-off sequence such as startup.
+
+    Each ``mark(name)`` closes the phase that ran since the previous mark
+    and records it as the span ``<prefix>.<name>``.
+    """
+
+    def __init__(self, prefix: str, start: float | None = None):
+        self.prefix = prefix
+        self.start = start if start is not None else time.perf_counter()
+        self._last = self.start
+        self.phases: dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        if name in self.phases:
+            return
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+        telemetry.record(f"{self.prefix}.{name}", self.phases[name])
+
+    def report(self) -> dict:
+        return {
+            "phases_ms": {name: round(s * 1000, 1) for name, s in self.phases.items()},
+            "total_ms": round((self._last - self.start) * 1000, 1),
+        }
+
+    def append_to(self, path: str, **fields) -> None:
+        """Append the report as one JSON line, so runs can be compared over time."""
+        line = json.dumps({"t": round(time.time(), 3), **self.report(), **fields})
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def process_age() -> float | None:
+    """Seconds since this process was created, covering interpreter startup."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            times = [wintypes.FILETIME() for _ in range(4)]
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), *map(ctypes.byref, times)):
+                return None
+            created = (times[0].dwHighDateTime << 32 | times[0].dwLowDateTime) / 1e7 - 11644473600
+            return time.time() - created
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _format_gauge(value) -> str:
+    if isinstance(value, dict):
+        return " ".join(f"{k}={v}" for k, v in value.items())
+    return str(value)
+
+
+telemetry = Telemetry()
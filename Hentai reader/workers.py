@@ -0,0 +1,237 @@
+"""App-wide prioritized worker pool with per-host concurrency limits.
+
+Queued jobs are simply dropped when cancelled. A job that is already
+running is aborted cooperatively: ``Job.abort()`` flags it, and the long
+waits inside it (streamed downloads, retry back-off) call
+``check_cancelled()`` or ``sleep()`` and unwind with ``Cancelled``.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from telemetry import telemetry
+
+
+# Priority classes, lowest runs first. Search/chapter-list calls the user is
+# waiting on share the top class with the visible reader page.
+PRIORITY_PAGE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_COVER_VISIBLE = 2
+PRIORITY_COVER_OFFSCREEN = 3
+PRIORITY_DOWNLOAD = 4
+
+
+def host_of(url: str) -> str | None:
+    return urlsplit(url).hostname
+
+
+class Cancelled(Exception):
+    """Raised inside a running job that was aborted."""
+
+
+_current = threading.local()
+
+
+def current_job() -> "Job | None":
+    """The job running on this thread, if it is a pool worker."""
+    return getattr(_current, "job", None)
+
+
+def check_cancelled() -> None:
+    """Raise Cancelled if the job running on this thread has been aborted."""
+    job = current_job()
+    if job is not None and job.aborted:
+        raise Cancelled()
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that an abort of the current job cuts short."""
+    job = current_job()
+    if job is None:
+        time.sleep(seconds)
+    elif job._abort.wait(seconds):
+        raise Cancelled()
+
+
+def bind(fn):
+    """``fn`` made to run as part of the current job on another thread, so
+    check_cancelled() and sleep() there answer to that job's abort."""
+    job = current_job()
+
+    def run(*args, **kwargs):
+        _current.job = job
+        try:
+            check_cancelled()
+            return fn(*args, **kwargs)
+        finally:
+            _current.job = None
+    return run
+
+class Job(Future):
+    """A queued call. Cancel it, or change its priority while it is still queued."""
+
+    def __init__(self, fn, args, kwargs, priority: int, host: str | None, group: str | None, seq: int):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.host = host
+        self.group = group
+        self.seq = seq
+        self.submitted = time.perf_counter()
+        self._abort = threading.Event()
+
+    @property
+    def aborted(self) -> bool:
+        return self._abort.is_set()
+
+    def abort(self) -> None:
+        """Cancel if still queued, otherwise ask the running call to stop."""
+        self._abort.set()
+        self.cancel()
+
+    def sort_key(self) -> tuple[int, int]:
+        return self.priority, self.seq
+
+
+class WorkerPool:
+    """Bounded thread pool that runs the highest-priority runnable job first.
+
+    A job is runnable when fewer than ``per_host`` jobs for the same host are
+    already running, so one slow image host cannot occupy every worker.
+    """
+
+    def __init__(self, max_workers: int = 8, per_host: int = 4):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self._queue: list[Job] = []
+        self._active_hosts: dict[str, int] = {}
+        self._running: set[Job] = set()
+        self._threads: list[threading.Thread] = []
+        self._idle = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+
+    def submit(
+        self,
+        fn,
+        *args,
+        priority: int = PRIORITY_PAGE,
+        host: str | None = None,
+        group: str | None = None,
+        **kwargs,
+    ) -> Job:
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("WorkerPool is shut down")
+            job = Job(fn, args, kwargs, priority, host, group, next(self._seq))
+            self._queue.append(job)
+            # Idle workers only leave _idle once they wake, so compare with the
+            # backlog rather than checking for zero: a burst of submits would
+            # otherwise all count the same sleeping worker
+            if len(self._queue) > self._idle and len(self._threads) < self.max_workers:
+                t = threading.Thread(target=self._worker, daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+        return job
+
+    def reprioritize(self, job: Job, priority: int) -> bool:
+        """Move a queued job to another priority class. False if already started."""
+        with self._cond:
+            if job not in self._queue:
+                return False
+            job.priority = priority
+            self._cond.notify()
+            return True
+
+    def reprioritize_group(self, group: str, priority: int) -> int:
+        with self._cond:
+            n = 0
+            for job in self._queue:
+                if job.group == group:
+                    job.priority = priority
+                    n += 1
+            return n
+
+    def cancel_group(self, group: str, running: bool = False) -> int:
+        """Drop every queued job in ``group``; with ``running``, abort the
+        ones already started too. Otherwise those are left to finish."""
+        with self._cond:
+            dropped = [j for j in self._queue if j.group == group]
+            self._queue = [j for j in self._queue if j.group != group]
+            queued = len(dropped)
+            if running:
+                dropped += [j for j in self._running if j.group == group]
+        for i, job in enumerate(dropped):
+            job.abort()
+            if i < queued:
+                # No worker will pick it up now; complete the cancellation so
+                # concurrent.futures.wait() and done-callbacks see it
+                job.set_running_or_notify_cancel()
+        return len(dropped)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._shutdown = True
+            dropped, self._queue = self._queue, []
+            self._cond.notify_all()
+        for job in dropped:
+            job.cancel()
+            job.set_running_or_notify_cancel()
+
+    def _next_job(self) -> Job | None:
+        # Caller holds the lock
+        best = None
+        for job in self._queue:
+            if job.host is not None and self._active_hosts.get(job.host, 0) >= self.per_host:
+                continue
+            if best is None or job.sort_key() < best.sort_key():
+                best = job
+        if best is not None:
+            self._queue.remove(best)
+        return best
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    job = self._next_job()
+                if job.host is not None:
+                    self._active_hosts[job.host] = self._active_hosts.get(job.host, 0) + 1
+                self._running.add(job)
+            try:
+                if job.set_running_or_notify_cancel():
+                    telemetry.record(f"pool.wait.p{job.priority}", time.perf_counter() - job.submitted)
+                    _current.job = job
+                    try:
+                        job.set_result(job.fn(*job.args, **job.kwargs))
+                    except Cancelled as e:
+                        telemetry.count("jobs.aborted")
+                        job.set_exception(e)
+                    except BaseException as e:
+                        job.set_exception(e)
+                    finally:
+                        _current.job = None
+            finally:
+                with self._cond:
+                    self._running.discard(job)
+                    if job.host is not None:
+                        self._active_hosts[job.host] -= 1
+                        # A job held back by the host limit may be runnable now
+                        self._cond.notify_all()